@@ -1,11 +1,24 @@
 #!/usr/bin/env python
 
 import argparse
+import os
+import sys
+import time
 
-from twentyfortyeight import game
-from twentyfortyeight.game.common import GAMEOVER
-from twentyfortyeight.game.game import Game
-from twentyfortyeight.strategy.basic import SpinnyStrategy, RandomStrategy
+# The game and strategy code imports its siblings from the twentyfortyeight
+# directory as the root (`from game.game import Game`), so put it on the
+# path and import everything through that root.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "twentyfortyeight"))
+
+from game.common import GAMEOVER, ILLEGAL
+from game.game import Game
+from game.rng import CounterRng
+from strategy.eval_cache import EvaluationCache, strategy_key
+from strategy.factory import make_strategy
+from strategy.score_stats import GameStats
+from strategy.telemetry import (
+    Telemetry, add_telemetry_arguments, start_telemetry_reporting)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
@@ -21,34 +34,93 @@ if __name__ == '__main__':
                         help="Show score summary instead of score per game.")
     parser.add_argument('--number_of_games', type=int, default=1,
                         help="number of games to run")
+    parser.add_argument('--precision', type=float, default=None,
+                        help=("If set, ignore --number_of_games and play "
+                              "games until the mean score is known to "
+                              "within this many points"))
+    parser.add_argument('--compare_to', type=float, default=None,
+                        help=("If set, ignore --number_of_games and play "
+                              "games until it is clear whether the mean "
+                              "score is above or below this reference"))
+    parser.add_argument('--opening_book', metavar='FILENAME', type=str,
+                        help=("npz file of an opening book to consult and "
+                              "extend (created if it does not exist)"))
+    parser.add_argument('--cache', metavar='FILENAME', type=str,
+                        help=("sqlite file of cached game outcomes:  play "
+                              "seeded games, skipping those already cached"))
+    parser.add_argument('--first_seed', type=int, default=0,
+                        help="with --cache, seeds run from this value upward")
+    add_telemetry_arguments(parser)
     args = parser.parse_args()
+    if args.cache and args.opening_book:
+        parser.error("--cache cannot be used with --opening_book, as "
+                     "outcomes with a growing book do not replay")
 
-    strategy = None
-    if args.strategy == "spinny":
-        strategy = SpinnyStrategy()
-    elif args.strategy == "random":
-        strategy = RandomStrategy()
-    else:
-        from strategy.nn.nn_strategy import ModelStrategy
-        strategy = ModelStrategy(args.strategy, verbose_period=5000)
+    strategy = make_strategy(args.strategy, verbose_period=5000)
+    if args.opening_book:
+        from strategy.opening_book import OpeningBookStrategy
+        strategy = OpeningBookStrategy(strategy, args.opening_book)
+    cache, cache_key = None, None
+    if args.cache:
+        cache = EvaluationCache(args.cache)
+        cache_key = strategy_key(args.strategy)
+    telemetry = Telemetry()
+    reporters = start_telemetry_reporting(args, telemetry)
 
-    total = 0
-    for i in range(args.number_of_games):
-        game = Game()
-        running = True
-        while running:
-            turn_outcome = game.do_turn(
-                strategy.get_move(game.board(), game.score()))
-            if args.verbose:
-                game.pretty_print()
-            running = (turn_outcome != GAMEOVER)
-        strategy.notify_outcome(game.board(), game.score())
-        if not args.summary:
-            print(game.score())
-        total += game.score()
-        if not (i % 25):
-            print("...", i, "/", args.number_of_games)
-    if args.summary:
-        print("Strategy %s had average score %f after %d games" %
-              (args.strategy,
-               (total / args.number_of_games), args.number_of_games))
+    if args.precision is not None or args.compare_to is not None:
+        from strategy.strategy_evaluator import StrategyEvaluator
+        result = StrategyEvaluator(
+            strategy, cache, cache_key, args.first_seed,
+            telemetry).evaluate_sequential(
+            precision=args.precision, reference=args.compare_to)
+        print("Strategy %s had average score %f (95%% CI %f to %f) "
+              "after %d games" %
+              (args.strategy, result.mean, result.low, result.high,
+               result.num_runs))
+        if args.compare_to is not None:
+            print(["Inconclusive against", "Better than",
+                   "Worse than"][result.verdict], args.compare_to)
+    else:
+        stats = GameStats()
+        for i in range(args.number_of_games):
+            seed = args.first_seed + i
+            outcome = cache and cache.get(cache_key, seed)
+            if not outcome:
+                game = Game(rnd=CounterRng(seed)) if cache else Game()
+                num_moves = 0
+                running = True
+                while running:
+                    move_start = time.perf_counter()
+                    move = strategy.get_move(game.board(), game.score())
+                    latency = time.perf_counter() - move_start
+                    turn_outcome = game.do_turn(move)
+                    telemetry.record_move(latency, turn_outcome == ILLEGAL)
+                    num_moves += (turn_outcome != ILLEGAL)
+                    if args.verbose:
+                        game.pretty_print()
+                    running = (turn_outcome != GAMEOVER)
+                strategy.notify_outcome(game.board(), game.score())
+                outcome = (game.score(),
+                           max(max(column)
+                               for column in game.board().columns()),
+                           num_moves)
+                if cache:
+                    cache.put(cache_key, seed, outcome)
+            telemetry.record_game(outcome[0])
+            stats.add(*outcome)
+            if not args.summary:
+                print(outcome[0])
+            if not (i % 25):
+                print("...", i, "/", args.number_of_games)
+        if args.summary:
+            print("Strategy %s had average score %f after %d games" %
+                  (args.strategy, stats.scores().mean(), stats.count()))
+            for line in stats.summary_lines():
+                print("  " + line)
+    for reporter in reporters:
+        reporter.stop()
+    if cache:
+        cache.close()
+    if args.opening_book:
+        strategy.save()
+        print("Opening book statistics:", strategy.stats())
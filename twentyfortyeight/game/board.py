@@ -1,5 +1,3 @@
-import copy
-
 import numpy as np
 
 from .common import WIDTH, HEIGHT, list_zip, PRETTY_PRINT
@@ -12,6 +10,37 @@ ENCODING = {**{0: np.array([[0]])},
             **{2 ** n: np.array([[n]]) for n in range(1, MAX_TILE)}}
 
 
+_NIBBLE_SHIFTS = np.arange(0, 4 * WIDTH * HEIGHT, 4, dtype=np.uint64)
+
+
+def pack_exponents(exponents):
+    """Packs an (n, WIDTH * HEIGHT) array of tile exponents (as from
+    Board.as_vector) four bits per cell into an (n,) uint64 array, in the
+    layout of Board.as_packed."""
+    exponents = np.asarray(exponents).astype(np.uint64)
+    return np.bitwise_or.reduce(exponents << _NIBBLE_SHIFTS, axis=1)
+
+
+def unpack_exponents(packed):
+    """The inverse of pack_exponents:  @return an (n, WIDTH * HEIGHT) uint8
+    array of tile exponents."""
+    packed = np.asarray(packed, dtype=np.uint64).reshape(-1, 1)
+    return ((packed >> _NIBBLE_SHIFTS) & np.uint64(0xF)).astype(np.uint8)
+
+
+def exponents_can_move(exponents):
+    """Vectorized Board.can_move:  @return an (n,) bool array of whether
+    there is any move on each board of the (n, WIDTH * HEIGHT) array of tile
+    exponents @p exponents."""
+    cells = np.asarray(exponents).reshape(-1, WIDTH, HEIGHT)
+    empty = (cells == 0).reshape(len(cells), -1)
+    has_empty = empty.any(axis=1)
+    has_tile = (~empty).any(axis=1)
+    column_pairs = (cells[:, :, :-1] == cells[:, :, 1:]).any(axis=(1, 2))
+    row_pairs = (cells[:, :-1, :] == cells[:, 1:, :]).any(axis=(1, 2))
+    return np.where(has_empty, has_tile, column_pairs | row_pairs)
+
+
 class Board(object):
     """An immutable class representing an arrangement of tiles on the game
     board.
@@ -60,15 +89,15 @@ class Board(object):
         return (list(self.row(i)) for i in range(HEIGHT))
 
     def copy(self):
-        return Board(copy.deepcopy(self._cols))
+        return Board(self._cols)
 
     def update(self, location, new_tile):
         """@return a new Board equal to this board everywhere except
         at @p location, where @new_tile has replaced the prior value."""
         (x, y) = location
-        new_cols = copy.deepcopy(self._cols)
-        new_cols[x][y] = new_tile
-        return Board(new_cols)
+        new_board = Board(self._cols)  # The constructor copies the columns.
+        new_board._cols[x][y] = new_tile
+        return new_board
 
     def rotate_cw(self):
         """Rotates a rectangular list of lists 'clockwise' (assuming
@@ -157,10 +186,31 @@ class Board(object):
         assert (result.shape == (1, Board.vector_width()))
         return result
 
+    def as_packed(self):
+        """@return the tile exponents of the board packed four bits per
+        cell into a single int, in the same cell order as as_vector()."""
+        packed = 0
+        shift = 0
+        for column in self._cols:
+            for cell in column:
+                if cell:
+                    packed |= (cell.bit_length() - 1) << shift
+                shift += 4
+        return packed
+
+    @staticmethod
+    def from_packed(packed):
+        """The inverse of as_packed()."""
+        exponents = [(packed >> (4 * i)) & 0xF for i in range(WIDTH * HEIGHT)]
+        return Board([[2 ** exponents[col * HEIGHT + row]
+                       if exponents[col * HEIGHT + row] else 0
+                       for row in range(HEIGHT)]
+                      for col in range(WIDTH)])
+
     @staticmethod
     def from_vector(vec):
         # Encoding this back into a board requires some reformatting.
-        tile_values = [0 if int(tile) == 0 else int(2 ** tile)
+        tile_values = [0 if int(tile) == 0 else 2 ** int(tile)
                        for tile in vec.flatten()]
         board = Board([[tile_values[col * HEIGHT + row]
                         for row in range(HEIGHT)]
@@ -10,7 +10,10 @@ from .common import (STARTING_TILES, HEIGHT, WIDTH,
 
 class Game(object):
     """A class representing a game in progress.  Also contains some public
-    static constants of use to other classes."""
+    static constants of use to other classes.
+
+    The random source @p rnd may be a `random.Random` or, for reproducible
+    parallel runs, a game.rng.CounterRng."""
 
     def __init__(self, board=None, rnd=None, score=0):
         self._rnd = rnd if rnd is not None else random.Random()
@@ -26,6 +29,30 @@ class Game(object):
         return ("Game(%s, %s, %s)" %
                 (self._board, self._rnd.getstate(), self._score))
 
+    def fork(self, exact_rng=False):
+        """@return an independent copy of this game, for lookahead and
+        rollouts.  Boards are immutable, so the copy shares this game's
+        board rather than copying it.
+
+        If @p exact_rng, the copy's random source is a snapshot of this
+        game's, so the copy draws exactly the tiles this game would.
+        Otherwise it is a cheap child source that draws different tiles:
+        for a CounterRng, a child stream that leaves this game's stream
+        untouched; for a `random.Random`, a new generator seeded from one
+        draw of this game's."""
+        if exact_rng and isinstance(self._rnd, random.Random):
+            # Faster than copy.copy, which seeds from the OS before
+            # setting the state.
+            rnd = random.Random.__new__(type(self._rnd))
+            rnd.setstate(self._rnd.getstate())
+        elif exact_rng:
+            rnd = copy.copy(self._rnd)
+        elif hasattr(self._rnd, "spawn"):
+            rnd = self._rnd.spawn()
+        else:
+            rnd = random.Random(self._rnd.getrandbits(64))
+        return Game(board=self._board, rnd=rnd, score=self._score)
+
     def pretty_print(self):
         print(self._score)
         self._board.pretty_print()
@@ -37,10 +64,13 @@ class Game(object):
         return self._score
 
     def _add_tile(self, tile_value=None):
-        open_spaces = {(x, y)
-                       for y in range(HEIGHT)
+        """Adds @p tile_value (or a random tile) at a random open space.
+        Always consumes exactly two draws from the random source; see
+        game.rng."""
+        open_spaces = [(x, y)
                        for x in range(WIDTH)
-                       if not self._board[(x, y)]}
+                       for y in range(HEIGHT)
+                       if not self._board[(x, y)]]
         if not open_spaces:
             return False
         r = self._rnd.random()
@@ -51,7 +81,7 @@ class Game(object):
                     break
                 else:
                     r -= freq
-        (new_x, new_y) = self._rnd.sample(open_spaces, 1)[0]
+        (new_x, new_y) = open_spaces[self._rnd.randrange(len(open_spaces))]
         self._board = self._board.update((new_x, new_y), tile_value)
         return True
 
@@ -64,7 +94,7 @@ class Game(object):
         """Smashes in the given direction, leaving the board rotated
         with direction pointed up.  Returns True iff the smash actually
         changed anything other than the rotation."""
-        new_board = copy.deepcopy(self._board)
+        new_board = self._board  # Boards are immutable; no need to copy.
         for _ in range(direction):
             new_board = new_board.rotate_cw()
         changed, turn_score, new_board = new_board.smash_up()
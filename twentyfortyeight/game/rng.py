@@ -0,0 +1,184 @@
+"""Counter-based random streams for tile spawning.
+
+A `random.Random` is a sequential generator:  to reproduce the tiles of the
+k'th game of a run one must replay games 0 through k-1.  The generator here
+is instead a pure function (Philox4x32-10, as in Salmon et al.'s Random123
+and NumPy's `Philox`) from a key and a counter to random bits, with the key
+derived from a seed by NumPy's `SeedSequence`.  Every draw is therefore
+directly addressable by (seed, game index, draw index), and draws for many
+games at once can be computed in a single vectorized call.
+
+Each tile spawn consumes exactly two draws (one for the tile value, one for
+its position), so spawn k of a game uses draws 2k and 2k+1; the two
+starting tiles are spawns 0 and 1."""
+
+import numpy as np
+
+from .common import TILE_FREQ
+
+_MASK32 = 0xFFFFFFFF
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_PHILOX_M = (0xD2511F53, 0xCD9E8D57)
+_PHILOX_W = (0x9E3779B9, 0xBB67AE85)
+_PHILOX_ROUNDS = 10
+WORDS_PER_BLOCK = 4
+DRAWS_PER_SPAWN = 2
+_TILE_CUMULATIVE_FREQ = np.cumsum([freq for (_, freq) in TILE_FREQ])
+_TILE_VALUES = np.array([tile for (tile, _) in TILE_FREQ])
+
+
+def seed_key(seed):
+    """@return the Philox key (a pair of 32-bit ints) for @p seed."""
+    k0, k1 = np.random.SeedSequence(seed).generate_state(2, dtype=np.uint32)
+    return int(k0), int(k1)
+
+
+def _mix64(x):
+    """The splitmix64 finalizer:  a cheap bijective scrambling of 64 bits."""
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _counter(block, game_index):
+    return (block & _MASK32, block >> 32,
+            game_index & _MASK32, game_index >> 32)
+
+
+def philox(counter, key):
+    """Philox4x32-10 on a single 4-word @p counter and 2-word @p key, in
+    plain python integers.  @return the four output words."""
+    c0, c1, c2, c3 = counter
+    k0, k1 = key
+    for r in range(_PHILOX_ROUNDS):
+        if r:
+            k0 = (k0 + _PHILOX_W[0]) & _MASK32
+            k1 = (k1 + _PHILOX_W[1]) & _MASK32
+        product0 = _PHILOX_M[0] * c0
+        product1 = _PHILOX_M[1] * c2
+        c0, c1, c2, c3 = ((product1 >> 32) ^ c1 ^ k0, product1 & _MASK32,
+                          (product0 >> 32) ^ c3 ^ k1, product0 & _MASK32)
+    return c0, c1, c2, c3
+
+
+def philox_vectorized(counters, key):
+    """Philox4x32-10 on an (n, 4) array of @p counters, all with the same
+    2-word @p key.  @return an (n, 4) uint64 array of output words."""
+    c = [np.asarray(counters[:, i], dtype=np.uint64) for i in range(4)]
+    k0, k1 = key
+    for r in range(_PHILOX_ROUNDS):
+        if r:
+            k0 = (k0 + _PHILOX_W[0]) & _MASK32
+            k1 = (k1 + _PHILOX_W[1]) & _MASK32
+        product0 = np.uint64(_PHILOX_M[0]) * c[0]
+        product1 = np.uint64(_PHILOX_M[1]) * c[2]
+        c = [(product1 >> np.uint64(32)) ^ c[1] ^ np.uint64(k0),
+             product1 & np.uint64(_MASK32),
+             (product0 >> np.uint64(32)) ^ c[3] ^ np.uint64(k1),
+             product0 & np.uint64(_MASK32)]
+    return np.stack(c, axis=1)
+
+
+def draw_words(seed, game_indices, draw_indices):
+    """@return a uint64 array of the 32-bit draws numbered @p draw_indices
+    of the games numbered @p game_indices (equal-length integer arrays)
+    for @p seed."""
+    game_indices = np.asarray(game_indices, dtype=np.uint64)
+    draw_indices = np.asarray(draw_indices, dtype=np.uint64)
+    blocks = draw_indices // np.uint64(WORDS_PER_BLOCK)
+    counters = np.stack([blocks & np.uint64(_MASK32),
+                         blocks >> np.uint64(32),
+                         game_indices & np.uint64(_MASK32),
+                         game_indices >> np.uint64(32)], axis=1)
+    words = philox_vectorized(counters, seed_key(seed))
+    word_in_block = (draw_indices % np.uint64(WORDS_PER_BLOCK)).astype(int)
+    return words[np.arange(len(words)), word_in_block]
+
+
+def draw_spawns(seed, game_indices, spawn_indices, num_open):
+    """Vectorized equivalent of Game._add_tile's random choices for many
+    games at once:  spawn @p spawn_indices of games @p game_indices, each
+    with @p num_open empty cells.
+
+    @return (tile_values, cell_indices), where cell_indices index each
+    game's empty cells in Game._add_tile's (column-major) order."""
+    spawn_indices = np.asarray(spawn_indices, dtype=np.uint64)
+    value_draws = spawn_indices * np.uint64(DRAWS_PER_SPAWN)
+    value_words = draw_words(seed, game_indices, value_draws)
+    cell_words = draw_words(seed, game_indices, value_draws + np.uint64(1))
+    tile_choice = np.searchsorted(_TILE_CUMULATIVE_FREQ,
+                                  value_words / float(1 << 32), side="right")
+    tile_values = _TILE_VALUES[np.minimum(tile_choice, len(TILE_FREQ) - 1)]
+    cell_indices = ((cell_words * np.asarray(num_open, dtype=np.uint64))
+                    >> np.uint64(32)).astype(int)
+    return tile_values, cell_indices
+
+
+class CounterRng(object):
+    """The draws of one game as a stream, providing the subset of the
+    `random.Random` interface that Game uses.  All state is the triple
+    (seed, game_index, draw), so copying or addressing a stream is cheap."""
+
+    def __init__(self, seed=0, game_index=0, draw=0):
+        self._seed = seed
+        self._key = seed_key(seed)
+        self._game_index = game_index
+        self._draw = draw
+        self._block_index = None
+        self._block = None
+        self._num_children = 0
+
+    def __copy__(self):
+        """A copy at the same point of the same stream, sharing the derived
+        key rather than deriving it again."""
+        other = CounterRng.__new__(CounterRng)
+        other.__dict__.update(self.__dict__)
+        return other
+
+    def __repr__(self):
+        return "CounterRng(%s, %s, %s)" % self.getstate()
+
+    def getstate(self):
+        return self._seed, self._game_index, self._draw
+
+    def setstate(self, state):
+        seed, self._game_index, self._draw = state
+        if seed != self._seed:
+            self._seed, self._key = seed, seed_key(seed)
+        self._block_index = None
+
+    def seek_spawn(self, spawn_index):
+        """Position the stream at the start of tile spawn @p spawn_index."""
+        self._draw = spawn_index * DRAWS_PER_SPAWN
+
+    def spawn(self):
+        """@return a new CounterRng on a stream of its own, without drawing
+        from (or otherwise disturbing) this stream.  Children are numbered,
+        so the n'th child of a given stream is always the same stream.
+        Child game indices are scrambled into the upper half of the 64-bit
+        range, well away from the game indices of a sequential run."""
+        self._num_children += 1
+        child = self.__copy__()
+        child._game_index = (_mix64((self._game_index << 20) ^
+                                    self._num_children) | (1 << 63))
+        child._draw = 0
+        child._block_index = None
+        child._num_children = 0
+        return child
+
+    def _next_word(self):
+        block_index, word = divmod(self._draw, WORDS_PER_BLOCK)
+        if block_index != self._block_index:
+            self._block = philox(_counter(block_index, self._game_index),
+                                 self._key)
+            self._block_index = block_index
+        self._draw += 1
+        return self._block[word]
+
+    def random(self):
+        """@return the next draw as a float in [0, 1)."""
+        return self._next_word() / float(1 << 32)
+
+    def randrange(self, n):
+        """@return the next draw as an int in [0, n)."""
+        return (self._next_word() * n) >> 32
@@ -1,6 +1,9 @@
 import unittest
 
-from game.board import Board
+import numpy as np
+
+from game.board import (Board, exponents_can_move, pack_exponents,
+                        unpack_exponents)
 from game.common import *
 
 
@@ -136,6 +139,18 @@ class TestBoard(unittest.TestCase):
         self.assertEqual(smashed, board)
         self.assertIsNot(smashed, board)
 
+    def test_vectorized_can_move(self):
+        boards = [Board(), Board().update([1, 2], 2), self.realistic_board,
+                  Board([[2, 4, 2, 4], [4, 2, 4, 2],
+                         [2, 4, 2, 4], [4, 2, 4, 2]]),
+                  Board([[2, 4, 2, 4], [4, 2, 4, 2],
+                         [2, 4, 2, 4], [4, 2, 2, 8]])]
+        vectors = np.concatenate([board.as_vector() for board in boards])
+        self.assertEqual(list(exponents_can_move(vectors)),
+                         [board.can_move() for board in boards])
+        self.assertEqual(list(exponents_can_move(vectors)),
+                         [False, True, True, False, True])
+
     def test_encoding(self):
         board = self.realistic_board
         encoding = board.as_vector()
@@ -143,6 +158,34 @@ class TestBoard(unittest.TestCase):
         decoding = Board.from_vector(encoding)
         self.assertEqual(board, decoding)
 
+    def test_decoding_uint8(self):
+        # Datasets hold exponents as uint8, in which 2 ** 8 overflows.
+        vector = np.zeros(16, dtype=np.uint8)
+        vector[:4] = [9, 8, 1, 2]
+        board = Board.from_vector(vector)
+        self.assertEqual(board.column(0), [512, 256, 2, 4])
+        self.assertEqual(Board.from_vector(
+            self.realistic_board.as_vector().astype(np.uint8)),
+                         self.realistic_board)
+
+    def test_packing(self):
+        board = self.realistic_board
+        packed = board.as_packed()
+        self.assertLess(packed, 1 << 64)
+        self.assertEqual(packed & 0xF, 1)  # The 2 at (0, 0).
+        self.assertEqual(Board.from_packed(packed), board)
+        self.assertEqual(Board().as_packed(), 0)
+
+    def test_vectorized_packing(self):
+        vectors = np.concatenate([self.realistic_board.as_vector(),
+                                  Board().as_vector(),
+                                  np.full((1, 16), 14)])
+        packed = pack_exponents(vectors)
+        self.assertEqual(packed.dtype, np.uint64)
+        self.assertEqual(int(packed[0]), self.realistic_board.as_packed())
+        self.assertEqual(int(packed[1]), 0)
+        self.assertTrue((unpack_exponents(packed) == vectors).all())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -3,6 +3,7 @@ import unittest
 
 from game.board import Board
 from game.game import Game
+from game.rng import CounterRng
 from game.common import *
 
 
@@ -33,3 +34,37 @@ class TestBoard(unittest.TestCase):
             else:
                 self.assertTrue(game.smash(direction))
                 self.assertEqual(game.board()[0, 0], 0)
+
+    def test_fork(self):
+        for rnd in [random.Random(1), CounterRng(seed=1)]:
+            game = Game(rnd=rnd)
+            game.do_turn(DOWN)
+            fork = game.fork()
+            self.assertIs(fork.board(), game.board())
+            self.assertEqual(fork.score(), game.score())
+            board, score = game.board(), game.score()
+            for direction in [UP, LEFT, DOWN, RIGHT] * 5:
+                fork.do_turn(direction)
+            self.assertEqual(game.board(), board)
+            self.assertEqual(game.score(), score)
+
+    def test_fork_exact_rng(self):
+        for rnd in [random.Random(1), CounterRng(seed=1)]:
+            game = Game(rnd=rnd)
+            fork = game.fork(exact_rng=True)
+            for direction in [UP, LEFT, DOWN, RIGHT] * 5:
+                self.assertEqual(game.do_turn(direction),
+                                 fork.do_turn(direction))
+                self.assertEqual(game.board(), fork.board())
+
+    def test_fork_child_rng_leaves_counter_stream_alone(self):
+        game = Game(rnd=CounterRng(seed=1))
+        same = Game(rnd=CounterRng(seed=1))
+        first, second = game.fork(), game.fork()
+        self.assertNotEqual(first._rnd.getstate(), second._rnd.getstate())
+        # The n'th child of a stream is always the same stream.
+        same.fork()
+        self.assertEqual(same.fork()._rnd.getstate(), second._rnd.getstate())
+        for direction in [UP, LEFT, DOWN, RIGHT] * 5:
+            self.assertEqual(game.do_turn(direction), same.do_turn(direction))
+            self.assertEqual(game.board(), same.board())
@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+
+from game.board import Board
+from game.common import *
+from game.game import Game
+from game.rng import (CounterRng, draw_spawns, draw_words, philox,
+                      philox_vectorized)
+
+
+class TestRng(unittest.TestCase):
+    def test_philox_known_answers(self):
+        # Known-answer vectors from the Random123 distribution.
+        self.assertEqual(philox((0, 0, 0, 0), (0, 0)),
+                         (0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8))
+        self.assertEqual(
+            philox((0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344),
+                   (0xa4093822, 0x299f31d0)),
+            (0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1))
+
+    def test_vectorized_matches_scalar(self):
+        counters = np.array([[0, 0, 0, 0], [1, 2, 3, 4],
+                             [0xffffffff, 0, 7, 0]], dtype=np.uint64)
+        key = (12345, 67890)
+        vectorized = philox_vectorized(counters, key)
+        for i, counter in enumerate(counters):
+            self.assertEqual(tuple(int(w) for w in vectorized[i]),
+                             philox(tuple(int(c) for c in counter), key))
+
+    def test_stream_is_addressable(self):
+        rnd = CounterRng(seed=7, game_index=3)
+        words = [rnd.randrange(1 << 32) for _ in range(10)]
+        self.assertEqual(list(draw_words(7, [3] * 10, range(10))), words)
+        rnd.seek_spawn(2)
+        self.assertEqual(rnd.randrange(1 << 32), words[4])
+        self.assertNotEqual(words, [CounterRng(seed=7, game_index=4).
+                                    randrange(1 << 32) for _ in range(10)])
+
+    def test_state(self):
+        rnd = CounterRng(seed=7, game_index=3)
+        rnd.random()
+        copy = CounterRng()
+        copy.setstate(rnd.getstate())
+        self.assertEqual([rnd.random() for _ in range(5)],
+                         [copy.random() for _ in range(5)])
+
+    def test_game_reproducible(self):
+        game = Game(rnd=CounterRng(seed=1, game_index=5))
+        same = Game(rnd=CounterRng(seed=1, game_index=5))
+        self.assertEqual(game.board(), same.board())
+        for direction in [UP, LEFT, DOWN, RIGHT] * 5:
+            self.assertEqual(game.do_turn(direction), same.do_turn(direction))
+            self.assertEqual(game.board(), same.board())
+
+    def test_draw_spawns_matches_game(self):
+        # The first spawn of a game lands on an empty board.
+        game_indices = list(range(20))
+        tiles, cells = draw_spawns(3, game_indices, [0] * 20, [16] * 20)
+        for i in game_indices:
+            game = Game(board=Board(), rnd=CounterRng(3, i))
+            game._add_tile()
+            x, y = divmod(int(cells[i]), HEIGHT)
+            self.assertEqual(game.board()[x, y], tiles[i])
+
+
+if __name__ == '__main__':
+    unittest.main()
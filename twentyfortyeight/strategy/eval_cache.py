@@ -0,0 +1,121 @@
+"""A persistent cache of the outcomes of seeded games, so that evaluating a
+strategy again on the same seeds only plays the seeds it has not seen.
+
+An outcome (score, max_tile, num_moves) is keyed on:
+ * the strategy:  its name, or for a model file the hash of the file's
+   contents, so that a retrained model is never confused with its
+   predecessor and a renamed one is still recognized;
+ * the engine:  a hash of the sources of the game package, which decide
+   the tile stream of each seed and the rules, so that changing either
+   misses the cache rather than returning stale outcomes;
+ * the seed of the game's CounterRng.
+
+Named strategies are keyed on their name alone, so changes to their code
+need a fresh cache file.  The key does not capture any state a strategy
+carries between games, nor any wrapper around it, so only strategies whose
+games depend on nothing but their tiles are cached; see Strategy.cacheable.
+Strategies that make random moves of their own do not replay exactly, but
+their cached outcome is still a fair sample of a game on that seed.
+
+The cache is an sqlite database in write-ahead-log mode, which allows
+concurrent readers alongside a writer and makes concurrent writers wait
+their turn rather than fail."""
+
+import glob
+import hashlib
+import os
+import sqlite3
+
+ENGINE_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "game")
+BUSY_TIMEOUT_SECONDS = 60.
+# Seeds per query, safely below sqlite's limit on bound parameters.
+_LOOKUP_CHUNK = 500
+
+_engine_fingerprint = None
+
+
+def _file_digest(filename):
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def engine_fingerprint():
+    """@return a hash of the game engine's source files."""
+    global _engine_fingerprint
+    if _engine_fingerprint is None:
+        digest = hashlib.sha256()
+        for filename in sorted(glob.glob(os.path.join(ENGINE_DIR, "*.py"))):
+            digest.update(os.path.basename(filename).encode())
+            digest.update(_file_digest(filename).encode())
+        _engine_fingerprint = digest.hexdigest()[:16]
+    return _engine_fingerprint
+
+
+def strategy_key(name):
+    """@return the cache key of the strategy that make_strategy would build
+    for @p name."""
+    if os.path.isfile(name):
+        return "model:" + _file_digest(name)
+    return "name:" + name
+
+
+class EvaluationCache(object):
+    """The outcomes cached in the sqlite database @p filename (created if
+    it does not exist), for the current engine."""
+
+    def __init__(self, filename):
+        self._engine = engine_fingerprint()
+        self._connection = sqlite3.connect(filename,
+                                           timeout=BUSY_TIMEOUT_SECONDS)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS outcomes ("
+                " strategy TEXT NOT NULL,"
+                " engine TEXT NOT NULL,"
+                " seed INTEGER NOT NULL,"
+                " score INTEGER NOT NULL,"
+                " max_tile INTEGER NOT NULL,"
+                " num_moves INTEGER NOT NULL,"
+                " PRIMARY KEY (strategy, engine, seed))")
+
+    def lookup(self, key, seeds):
+        """@return a dict of seed to (score, max_tile, num_moves) for those
+        of @p seeds that have an outcome cached under strategy @p key."""
+        seeds = list(seeds)
+        outcomes = {}
+        for start in range(0, len(seeds), _LOOKUP_CHUNK):
+            chunk = seeds[start:start + _LOOKUP_CHUNK]
+            rows = self._connection.execute(
+                "SELECT seed, score, max_tile, num_moves FROM outcomes"
+                " WHERE strategy = ? AND engine = ? AND seed IN (%s)" %
+                ",".join("?" * len(chunk)),
+                [key, self._engine] + chunk)
+            for seed, score, max_tile, num_moves in rows:
+                outcomes[seed] = (score, max_tile, num_moves)
+        return outcomes
+
+    def get(self, key, seed):
+        """@return the outcome cached for @p seed under strategy @p key, or
+        None."""
+        return self.lookup(key, [seed]).get(seed)
+
+    def store(self, key, outcomes):
+        """Caches @p outcomes, a dict of seed to (score, max_tile,
+        num_moves), under strategy @p key, in one transaction.  Outcomes
+        already cached (perhaps by a concurrent writer) are kept."""
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO outcomes VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, self._engine, seed) + tuple(int(v) for v in outcome)
+                 for seed, outcome in outcomes.items()])
+
+    def put(self, key, seed, outcome):
+        self.store(key, {seed: outcome})
+
+    def close(self):
+        self._connection.close()
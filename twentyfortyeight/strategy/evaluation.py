@@ -0,0 +1,116 @@
+"""Static evaluation of boards for search-style strategies.
+
+Every heuristic here is a sum over the board's lines (its four rows and
+four columns) of a function of the line alone.  A line is four 4-bit tile
+exponents, so each heuristic is precomputed for all 65536 possible lines,
+and a board's score is then just eight table lookups; see BoardEvaluator.
+
+All line heuristics are symmetric under reversing the line, so the score of
+a board is the same under any rotation or reflection of it."""
+
+import numpy as np
+
+from game.common import HEIGHT, WIDTH
+
+NUM_LINES = 1 << 16
+_LINE_LENGTH = 4
+
+# Default weights of the line heuristics.  Tile-valued terms are in tile
+# exponents, so that large tiles do not swamp the count-valued terms.
+DEFAULT_WEIGHTS = {
+    # Number of empty cells.
+    "empty": 270.,
+    # Number of adjacent equal tiles, ignoring gaps.
+    "merges": 700.,
+    # Least total drop (in exponent ** 4) against either direction along
+    # the line; a penalty.
+    "monotonicity": -47.,
+    # Total difference between adjacent nonzero tiles; a penalty.
+    "smoothness": -10.,
+    # Tile exponents weighted towards the ends of the line, and hence
+    # (summing rows and columns) most towards the corners.
+    "corner": 20.,
+}
+_CORNER_POSITION_WEIGHTS = np.array([3., 1., 1., 3.])
+
+
+def line_exponents(lines):
+    """@return an (n, 4) array of the tile exponents of the 16-bit @p lines,
+    first cell in the lowest bits."""
+    lines = np.asarray(lines, dtype=np.uint32).reshape(-1, 1)
+    shifts = np.arange(0, 4 * _LINE_LENGTH, 4, dtype=np.uint32)
+    return ((lines >> shifts) & 0xF).astype(np.int64)
+
+
+def line_heuristics():
+    """@return a dict of each heuristic in DEFAULT_WEIGHTS to an array of
+    its (unweighted) value for every one of the 65536 lines."""
+    r = line_exponents(np.arange(NUM_LINES))
+    nonzero = r > 0
+    # Slide the tiles of each line together, keeping their order.
+    compressed = np.take_along_axis(
+        r, np.argsort(~nonzero, axis=1, kind="stable"), axis=1)
+    left, right = compressed[:, :-1], compressed[:, 1:]
+    powered = r.astype(float) ** 4
+    drops = powered[:, :-1] - powered[:, 1:]
+    return {
+        "empty": (~nonzero).sum(axis=1).astype(float),
+        "merges": ((left == right) & (left > 0)).sum(axis=1).astype(float),
+        "monotonicity": np.minimum(np.where(drops > 0, drops, 0).sum(axis=1),
+                                   np.where(drops < 0, -drops, 0).sum(axis=1)),
+        "smoothness": np.where(right > 0, np.abs(left - right),
+                               0).sum(axis=1).astype(float),
+        "corner": (r * _CORNER_POSITION_WEIGHTS).sum(axis=1),
+    }
+
+
+def board_lines(packed):
+    """@return an (n, 8) uint32 array of the column and row lines of the
+    (n,) uint64 array of boards @p packed (see game.board.pack_exponents)."""
+    packed = np.asarray(packed, dtype=np.uint64).reshape(-1, 1)
+    columns = ((packed >> (np.arange(WIDTH, dtype=np.uint64) * np.uint64(16)))
+               & np.uint64(0xFFFF))
+    # Row y takes nibble y of each column x into its nibble x.
+    nibble = np.uint64(0xF)
+    rows = np.zeros((len(packed), HEIGHT), dtype=np.uint64)
+    for x in range(WIDTH):
+        for y in range(HEIGHT):
+            rows[:, y] |= (((columns[:, x] >> np.uint64(4 * y)) & nibble)
+                           << np.uint64(4 * x))
+    return np.concatenate([columns, rows], axis=1).astype(np.uint32)
+
+
+class BoardEvaluator(object):
+    """Scores boards by a weighted sum of line heuristics, through a single
+    precomputed table of the weighted sum for every line."""
+
+    def __init__(self, weights=None):
+        """Weights not given in the dict @p weights take their values from
+        DEFAULT_WEIGHTS."""
+        self._weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        heuristics = line_heuristics()
+        self._table = sum(self._weights[name] * heuristics[name]
+                          for name in DEFAULT_WEIGHTS)
+        self._table_list = self._table.tolist()
+
+    def weights(self):
+        return dict(self._weights)
+
+    def evaluate(self, board):
+        """@return the score of the Board @p board."""
+        packed = board.as_packed()
+        table = self._table_list
+        score = 0.
+        for x in range(WIDTH):
+            score += table[(packed >> (16 * x)) & 0xFFFF]
+        for y in range(HEIGHT):
+            row = 0
+            for x in range(WIDTH):
+                row |= ((packed >> (16 * x + 4 * y)) & 0xF) << (4 * x)
+            score += table[row]
+        return score
+
+    def evaluate_packed(self, packed):
+        """@return an (n,) array of the scores of the (n,) uint64 array of
+        packed boards @p packed."""
+        return self._table[board_lines(packed)].sum(axis=1)
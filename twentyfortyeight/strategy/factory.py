@@ -0,0 +1,19 @@
+"""Construction of strategies from the names used on command lines."""
+
+from strategy.basic import RandomStrategy, SpinnyStrategy
+
+
+def make_strategy(name, verbose_period=None):
+    """@return a new strategy for @p name, which is either the name of a
+    basic strategy or the filename of a learned model.  A learned model
+    outputs the board state every @p verbose_period moves, if given."""
+    if name == "spinny":
+        return SpinnyStrategy()
+    elif name == "random":
+        return RandomStrategy()
+    elif name == "greedy":
+        from strategy.greedy import GreedyStrategy
+        return GreedyStrategy()
+    else:
+        from strategy.nn.nn_strategy import ModelStrategy
+        return ModelStrategy(name, verbose_period=verbose_period)
@@ -0,0 +1,33 @@
+"""A one-ply search strategy over a static board evaluation."""
+
+import numpy as np
+
+from game.common import DIRECTIONS
+from strategy.evaluation import BoardEvaluator
+from strategy.strategy import Strategy
+
+
+class GreedyStrategy(Strategy):
+    """Chooses the legal move whose resulting board (before the new tile is
+    added) has the best static evaluation plus the score of the move."""
+
+    def __init__(self, evaluator=None):
+        self._evaluator = evaluator or BoardEvaluator()
+
+    def get_move(self, board, score):
+        packed = np.zeros(len(DIRECTIONS), dtype=np.uint64)
+        values = np.full(len(DIRECTIONS), -np.inf)
+        legal = np.zeros(len(DIRECTIONS), dtype=bool)
+        for direction in DIRECTIONS:
+            rotated = board
+            for _ in range(direction):
+                rotated = rotated.rotate_cw()
+            # The evaluation is invariant to rotation, so there is no need
+            # to counter-rotate the resulting board.
+            changed, move_score, smashed = rotated.smash_up()
+            legal[direction] = changed
+            values[direction] = move_score
+            packed[direction] = smashed.as_packed()
+        values += self._evaluator.evaluate_packed(packed)
+        values[~legal] = -np.inf
+        return DIRECTIONS[int(np.argmax(values))]
@@ -3,19 +3,29 @@
 """Classes and functions related to dataset generation for learning Q
 functions.  Datasets in this sense are mappings from board positions
 (represented as flattened arrays of tile numbers) to score values.
+
+In memory, examples are held as rows of uint8 tile exponents; on disk each
+is packed four bits per tile into a single uint64 (see
+game.board.pack_exponents).  Files in the older layout of float64 rows are
+still read.
 """
 
 import argparse
 import sys
+import time
 
 import numpy as np
 
 from game.common import *
-from game.board import Board
+from game.board import Board, pack_exponents, unpack_exponents
 from game.game import Game
+from strategy.telemetry import (Telemetry, add_telemetry_arguments,
+                                start_telemetry_reporting)
 
 EXAMPLE_WIDTH = Board.vector_width()
 MAX_BATCH_SIZE = 4096  # numpy arrays get slow to update beyond this size.
+EXAMPLE_DTYPE = np.uint8
+SCORE_DTYPE = np.uint32
 
 class Dataset(object):
     """A set of training data (held as matrices whose rows are examples) and a
@@ -24,40 +34,53 @@ class Dataset(object):
     def __init__(self):
         """Creates a new empty dataset."""
         self._num_examples = 0
-        self._example_batches = [np.zeros((0, EXAMPLE_WIDTH))]
-        self._score_batches = [np.zeros((0, 1))]
+        self._example_batches = [np.zeros((0, EXAMPLE_WIDTH),
+                                          dtype=EXAMPLE_DTYPE)]
+        self._score_batches = [np.zeros((0,), dtype=SCORE_DTYPE)]
 
-    def add_game(self, player_strategy, rnd, starting_game_position=None):
+    def add_game(self, player_strategy, rnd, starting_game_position=None,
+                 telemetry=None):
         """Runs a game with the given strategy and randomness source, then
         enrolls the outcome in the dataset.
 
         If @p starting_position is a Game object, start from that position.
+        If @p telemetry is set, record the game's moves and outcome in it.
 
         Returns the number of examples (moves) added.
         """
-        states = np.zeros((1, EXAMPLE_WIDTH))
+        states = np.zeros((1, EXAMPLE_WIDTH), dtype=EXAMPLE_DTYPE)
         num_moves = 0
         game = starting_game_position or Game(rnd=rnd)
         running = True
         while running:
+            move_start = time.perf_counter()
+            move = player_strategy.get_move(game.board(), game.score())
+            latency = time.perf_counter() - move_start
             intermediate_board, turn_outcome = (
-                game.do_turn_and_retrieve_intermediate(
-                    player_strategy.get_move(game.board(), game.score())))
+                game.do_turn_and_retrieve_intermediate(move))
+            if telemetry:
+                telemetry.record_move(latency, turn_outcome == ILLEGAL)
             running = (turn_outcome != GAMEOVER)
             num_moves += (turn_outcome != ILLEGAL)
             if turn_outcome == OK:
-                states = np.append(states,
-                                   Board.as_vector(intermediate_board),
-                                   axis=0)
+                states = np.append(
+                    states,
+                    Board.as_vector(intermediate_board).astype(EXAMPLE_DTYPE),
+                    axis=0)
                 self._num_examples += 1
         player_strategy.notify_outcome(game.board(), game.score())
+        if telemetry:
+            telemetry.record_game(game.score())
+            telemetry.record_examples(len(states))
 
-        scores = Dataset.evaluate_states(states, game.board(), game.score)
+        scores = Dataset.evaluate_states(
+            states, game.board(), game.score).astype(SCORE_DTYPE)
         assert(len(states) == len(scores))
         batch_size_so_far = self._example_batches[-1].shape[0]
         if len(states) + batch_size_so_far > MAX_BATCH_SIZE:
-            self._example_batches.append(np.zeros((0, EXAMPLE_WIDTH)))
-            self._score_batches.append(np.zeros((0, 1)))
+            self._example_batches.append(
+                np.zeros((0, EXAMPLE_WIDTH), dtype=EXAMPLE_DTYPE))
+            self._score_batches.append(np.zeros((0,), dtype=SCORE_DTYPE))
         self._example_batches[-1] = \
             np.append(self._example_batches[-1], states, axis=0)
         self._score_batches[-1] = np.append(self._score_batches[-1], scores)
@@ -74,30 +97,48 @@ class Dataset(object):
         return np.array(list(range(len(states), 0, -1)))
 
     def add_n_examples(self, strategy, rnd, n,
-                       starting_positions_dataset=None):
+                       starting_positions_dataset=None,
+                       starting_positions_index=None, telemetry=None,
+                       stop_event=None):
         """Runs games and adds them to the dataset until at least @p n
-        examples have been added.  Returns the number of examples added.
+        examples have been added, or until @p stop_event (a threading or
+        multiprocessing Event) is set, if given; a game in progress is
+        finished first.  Returns the number of examples added.
 
         If @p starting_positions_dataset is set, games will be started from
         a randomly selected position from that dataset rather than from a
-        blank board."""
+        blank board.  If @p starting_positions_index (a
+        start_index.StartingPositionIndex) is set, games will be started from
+        a position sampled from it.  If @p telemetry is set, record the
+        games in it."""
         print("Adding", n, "examples to dataset.")
         added = 0
         while added < n:
+            if stop_event is not None and stop_event.is_set():
+                break
             starting_game = None
-            if starting_positions_dataset:
+            if starting_positions_index:
+                starting_game = Game(
+                    starting_positions_index.sample_board(rnd))
+            elif starting_positions_dataset:
                 random_position = starting_positions_dataset.nth_example(
                     rnd.randint(0,
                                 starting_positions_dataset.num_examples() - 1))
                 starting_game = Game(Board.from_vector(random_position))
                 if not starting_game.board().can_move():
                     continue
-            num_added = self.add_game(strategy, rnd, starting_game)
+            num_added = self.add_game(strategy, rnd, starting_game, telemetry)
             if (added // 10000) != ((num_added + added) // 10000):
                 print("Added %d so far..." % (num_added + added))
             added += num_added
         return added
 
+    def add_dataset(self, other):
+        """Adds all of the examples of the Dataset @p other to this one."""
+        self._example_batches += other.example_batches()
+        self._score_batches += other.score_batches()
+        self._num_examples += other.num_examples()
+
     def num_batches(self):
         return len(self._example_batches)
 
@@ -138,7 +179,8 @@ class Dataset(object):
     def save(self, filename):
         assert(filename.endswith(".npz"))
         num_batches = len(self._example_batches)
-        examples_dict = {"examples_%s" % i: self._example_batches[i]
+        examples_dict = {"packed_%s" % i:
+                         pack_exponents(self._example_batches[i])
                          for i in range(num_batches)}
         scores_dict = {"scores_%s" % i: self._score_batches[i]
                        for i in range(num_batches)}
@@ -156,10 +198,14 @@ class Dataset(object):
             data._score_batches = []
             num_batches = len(npz_data.files) // 2
             for i in range(num_batches):
-                data._example_batches.append(
-                    npz_data["examples_%s" % i])
+                if "packed_%s" % i in npz_data.files:
+                    examples = unpack_exponents(npz_data["packed_%s" % i])
+                else:  # The older, unpacked layout.
+                    examples = npz_data["examples_%s" % i].astype(
+                        EXAMPLE_DTYPE).reshape(-1, EXAMPLE_WIDTH)
+                data._example_batches.append(examples)
                 data._score_batches.append(
-                    npz_data["scores_%s" % i])
+                    npz_data["scores_%s" % i].astype(SCORE_DTYPE))
             data._num_examples = sum(array.shape[0]
                                      for array in data._example_batches)
             return data
@@ -182,32 +228,53 @@ def main(argv):
                         default=1.,
                         help=("If --starting_positions is set, start this "
                               "fraction of games from a new game position"))
+    parser.add_argument('--stratify_starts', action="store_true",
+                        help=("If set, draw starting positions evenly across "
+                              "strata of max tile, empty cells and depth "
+                              "rather than uniformly"))
+    parser.add_argument('--stratum_tile_bias', metavar='FACTOR', type=float,
+                        default=1.,
+                        help=("With --stratify_starts, weight each stratum by "
+                              "this factor to the power of its max tile "
+                              "exponent"))
+    add_telemetry_arguments(parser)
     args = parser.parse_args(argv[1:])
 
     import random
-    from strategy.basic import RandomStrategy, SpinnyStrategy
-    from strategy.nn.nn_strategy import ModelStrategy
+    from strategy.factory import make_strategy
 
-    if args.strategy == "spinny":
-        strategy = SpinnyStrategy()
-    elif args.strategy == "random":
-        strategy = RandomStrategy()
-    else:
-        strategy = ModelStrategy(args.strategy)
+    strategy = make_strategy(args.strategy)
 
     start_positions_dataset = None
+    start_positions_index = None
     if args.starting_positions:
         start_positions_dataset = Dataset.load(args.starting_positions)
+        if args.stratify_starts:
+            from strategy.nn.start_index import StartingPositionIndex
+            start_positions_index = StartingPositionIndex(
+                start_positions_dataset)
+            start_positions_index.set_weights(
+                lambda stratum: args.stratum_tile_bias ** stratum[0])
+            print("Indexed %d live starting positions in %d strata" %
+                  (start_positions_index.num_positions(),
+                   len(start_positions_index.strata())))
 
+    job_telemetry = Telemetry()
+    reporters = start_telemetry_reporting(args, job_telemetry)
     dataset = Dataset()
     num_added = dataset.add_n_examples(
-        strategy, random, args.num_examples * args.new_start_fraction)
+        strategy, random, args.num_examples * args.new_start_fraction,
+        telemetry=job_telemetry)
     if args.new_start_fraction < 1:
         assert start_positions_dataset, \
                "--new_start_fraction requires --starting_positions"
         num_added = dataset.add_n_examples(
             strategy, random, args.num_examples * (1 - args.new_start_fraction),
-            starting_positions_dataset=start_positions_dataset)
+            starting_positions_dataset=start_positions_dataset,
+            starting_positions_index=start_positions_index,
+            telemetry=job_telemetry)
+    for reporter in reporters:
+        reporter.stop()
     print("Added", num_added, "examples")
     print("saving...")
     dataset.save(args.output_file)
@@ -8,10 +8,18 @@ import numpy as np
 from game.board import Board, MAX_TILE
 from game.common import *
 from strategy.nn.data import Dataset, EXAMPLE_WIDTH
+from strategy.nn.replay import PrioritizedReplay
 
 
 HPARAMS = {"conv_channels": 30,
            "dense_sizes": [100, 50, 25],
+           # If set, the model takes the (EXAMPLE_WIDTH,) uint8 tile
+           # exponents and one-hot encodes them in the graph; if not, the
+           # caller must pass an (EXAMPLE_WIDTH, MAX_TILE) float one-hot.
+           "compact_input": True,
+           # With compact input, the width of a trainable tile embedding, or
+           # None to use a fixed one-hot encoding.
+           "tile_embedding": None,
            }
 
 # Note:  Throughout, 'x' refers to the complete set of training data, 'y'
@@ -25,30 +33,50 @@ def _shuffle_in_unison(*arrays):
         np.random.shuffle(array)
 
 
-def make_model():
-    raw_data = k.layers.Input(name="input",
-                              shape=(EXAMPLE_WIDTH, MAX_TILE),
-                              dtype='float32')
+def make_model(hparams=None):
+    """@return a new model.  Hyperparameters not given in the dict
+    @p hparams take their values from HPARAMS."""
+    hparams = {**HPARAMS, **(hparams or {})}
+    if hparams["compact_input"]:
+        raw_data = k.layers.Input(name="input",
+                                  shape=(EXAMPLE_WIDTH,),
+                                  dtype='uint8')
+        encoding_width = hparams["tile_embedding"] or MAX_TILE
+        # An untrainable identity embedding is exactly a one-hot encoding.
+        encoded = k.layers.Embedding(
+            name="tile_encoding",
+            input_dim=MAX_TILE,
+            output_dim=encoding_width,
+            embeddings_initializer=("uniform" if hparams["tile_embedding"]
+                                    else "identity"),
+            trainable=bool(hparams["tile_embedding"]),
+            )(raw_data)
+    else:
+        raw_data = k.layers.Input(name="input",
+                                  shape=(EXAMPLE_WIDTH, MAX_TILE),
+                                  dtype='float32')
+        encoding_width = MAX_TILE
+        encoded = raw_data
     print("Input X has shape", raw_data.shape)
     board = k.layers.Reshape(name="board",
-                             target_shape=(HEIGHT, WIDTH, MAX_TILE),
-                             )(raw_data)
+                             target_shape=(HEIGHT, WIDTH, encoding_width),
+                             )(encoded)
     print("Board (into convolutional layers) has shape", board.shape)
     h_conv = k.layers.Conv2D(name="h_conv",
-                             filters=HPARAMS["conv_channels"],
+                             filters=hparams["conv_channels"],
                              kernel_size=(4, 1),
                              activation="relu"
                              )(board)
-    h_conv_reshaped = k.layers.Reshape((HEIGHT * HPARAMS["conv_channels"],)
+    h_conv_reshaped = k.layers.Reshape((HEIGHT * hparams["conv_channels"],)
                                        )(h_conv)
     print("Horiz. convolutional output has shape", h_conv.shape,
           "reshaped to", h_conv_reshaped.shape)
     v_conv = k.layers.Conv2D(name="v_conv",
-                             filters=HPARAMS["conv_channels"],
+                             filters=hparams["conv_channels"],
                              kernel_size=(1, 4),
                              activation="relu",
                              )(board)
-    v_conv_reshaped = k.layers.Reshape((WIDTH * HPARAMS["conv_channels"],)
+    v_conv_reshaped = k.layers.Reshape((WIDTH * hparams["conv_channels"],)
                                        )(v_conv)
     print("Vert. convolutional output has shape", v_conv.shape,
           "reshaped to", v_conv_reshaped.shape)
@@ -56,8 +84,8 @@ def make_model():
     print("Shape from convs into densors is", convs.shape)
     previous_output = convs
     # noinspection PyTypeChecker
-    for i in range(len(HPARAMS["dense_sizes"])):
-        previous_output = k.layers.Dense(units=HPARAMS["dense_sizes"][i],
+    for i in range(len(hparams["dense_sizes"])):
+        previous_output = k.layers.Dense(units=hparams["dense_sizes"][i],
                                          activation="relu",
                                          name=("dense_%s" % i))(previous_output)
         print("  Shape after densor", i, "is", previous_output.shape)
@@ -68,43 +96,70 @@ def make_model():
     return k.Model(inputs=raw_data, outputs=result)
 
 
+def model_input(model, x_as_tiles):
+    """@returns the matrix @p x_as_tiles of (example, tiles) in the input
+    format of @p model:  unchanged (as uint8) for a compact-input model, or
+    one-hot encoded on the host for a model from before compact input."""
+    if len(model.input_shape) == 2:
+        return x_as_tiles.astype(np.uint8, copy=False)
+    return np.eye(MAX_TILE, dtype=np.float32)[x_as_tiles.astype(int)]
+
+
 def get_training_data(filename):
-    """@returns x, x_as_onehot, y where x is a matrix of (example, tiles) and
-    x_as_onehot is a tensor of (example, board position, onehot encoded tile)
-    and y is a column vector of scores."""
-    dataset = Dataset.load(filename)
+    """@returns x, y from the dataset in @p filename; see training_arrays."""
+    return training_arrays(Dataset.load(filename))
+
+
+def training_arrays(dataset):
+    """@returns x, y where x is a matrix of (example, tiles) and y is a
+    column vector of scores, shuffled alike.  Use model_input to convert x
+    to the input format of a given model."""
     dataset.collapse()
     x_as_tiles = dataset.example_batches()[0]
     m, board_size = x_as_tiles.shape
     assert board_size == 16
     y = dataset.score_batches()[0]
     assert y.shape == (m,)
-    # NOTE:  That Keras `to_categorical` retains the source dimensionality
-    # of a multidimensional input as its leading axes is observed true but
-    # not documented, and may be false in some versions/platforms!
-    x_as_onehot = k.utils.to_categorical(x_as_tiles, MAX_TILE)
-    assert(x_as_onehot.shape == (m, board_size, MAX_TILE))  # See NOTE above.
-    _shuffle_in_unison(x_as_tiles, x_as_onehot, y)
-    return x_as_tiles, x_as_onehot, y
+    _shuffle_in_unison(x_as_tiles, y)
+    return x_as_tiles, y
 
 
-def train_model(model, x, y, model_filename, num_epochs):
+def compile_model(model):
     model.compile(loss='mean_squared_error',
                   optimizer='Adam',
                   metrics=['mae'])
+
+
+def train_model(model, x, y, model_filename, num_epochs):
+    compile_model(model)
     model.fit(x, y, epochs=num_epochs, verbose=1)
     model.save(model_filename)
 
 
-def show_exemplar(model, x, x_as_onehot, y):
+def train_model_prioritized(model, replay, model_filename, num_steps,
+                            batch_size=32):
+    """Trains for @p num_steps gradient steps on minibatches drawn from the
+    PrioritizedReplay @p replay of (tiles, score) examples, updating each
+    sampled example's priority from its error just before the step."""
+    compile_model(model)
+    for step in range(num_steps):
+        indices, x, y, weights = replay.sample(batch_size)
+        x = model_input(model, x)
+        errors = model.predict_on_batch(x).flatten() - y
+        replay.update_priorities(indices, errors)
+        model.train_on_batch(x, y, sample_weight=weights)
+        if not (step % 1000):
+            print("Step %d: mean abs error of sampled batch %f" %
+                  (step, np.abs(errors).mean()))
+    model.save(model_filename)
+
+
+def show_exemplar(model, x, y):
     """Picks a random example from the data."""
     i = np.random.randint(0, x.shape[0])
     example = x[i, :]
-    example_as_onehot = x_as_onehot[i]
     score = y[i]
-    example_as_single_example = np.reshape(example_as_onehot,
-                                           (1, WIDTH * HEIGHT, MAX_TILE))
-    prediction = model.predict(example_as_single_example)
+    prediction = model.predict(model_input(model, x[i:i + 1, :]))
 
     board = Board.from_vector(example)
     board.pretty_print()
@@ -122,9 +177,13 @@ def main(argv):
                         help='keras model file to read in or output into')
     parser.add_argument('--epochs', type=int, help="number of training epochs",
                         default=5)
+    parser.add_argument('--prioritized_steps', type=int, default=None,
+                        help=("if set, instead of training for --epochs, "
+                              "train for this many minibatch steps sampled "
+                              "by prioritized replay"))
     args = parser.parse_args(argv[1:])
 
-    x, x_as_onehot, y = get_training_data(args.training_data)
+    x, y = get_training_data(args.training_data)
     load_file = args.transfer_from or args.model_file
     if os.path.isfile(load_file):
         print("Loading existing model from", load_file)
@@ -132,9 +191,16 @@ def main(argv):
     else:
         print("Training new model into", args.model_file)
         model = make_model()
-    train_model(model, x_as_onehot, y, args.model_file, args.epochs)
+    if args.prioritized_steps:
+        replay = PrioritizedReplay(len(y))
+        replay.add(x, y)
+        train_model_prioritized(model, replay, args.model_file,
+                                args.prioritized_steps)
+    else:
+        train_model(model, model_input(model, x), y, args.model_file,
+                    args.epochs)
     for i in range(5):
-        show_exemplar(model, x, x_as_onehot, y)
+        show_exemplar(model, x, y)
 
 
 if __name__ == '__main__':
@@ -1,8 +1,7 @@
 import keras as k
-import numpy as np
 
-from game.board import MAX_TILE
 from game.common import *
+from strategy.nn.model import model_input
 from strategy.strategy import Strategy
 
 
@@ -10,7 +9,9 @@ class ModelStrategy(Strategy):
     def __init__(self, model_filename, verbose_period=None):
         """Create a ModelStrategy reading the neural network from the given
         @p model_filename hdf5 file.  For debugging, output the board state
-        every @p verbose_period moves (leave None for no verbosity)"""
+        every @p verbose_period moves (leave None for no verbosity).
+        Models with either compact or one-hot input are accepted; see
+        model.model_input."""
         self._model = k.models.load_model(model_filename)
         self._verbosity = verbose_period or float("inf")
         self._count = 0
@@ -21,11 +22,8 @@ class ModelStrategy(Strategy):
         changed, _, board = board.smash_up()
         if not changed:
             return float('-inf')  # illegal move
-        as_vector = board.as_vector()
-        as_onehot = k.utils.to_categorical(as_vector, MAX_TILE)
-        example_as_single_example = np.reshape(as_onehot,
-                                               (1, WIDTH * HEIGHT, MAX_TILE))
-        return self._model.predict(example_as_single_example)
+        return self._model.predict(model_input(self._model,
+                                               board.as_vector()))
 
     def get_move(self, board, _):
         self._count += 1
@@ -0,0 +1,122 @@
+"""A prioritized replay buffer (Schaul et al., "Prioritized Experience
+Replay") for sampling training examples in proportion to their last
+training error rather than uniformly.
+
+Most examples in our datasets are easy early-game positions; sampling by
+error concentrates the gradient steps on the rarer positions that the model
+still gets wrong, with importance weights to correct for the bias this
+introduces into the loss."""
+
+import numpy as np
+
+
+class SumTree(object):
+    """A binary tree over @p capacity leaf priorities in which each node
+    holds the sum of its children, so that sampling a leaf in proportion to
+    its priority and updating a priority are both O(log n).  All operations
+    take arrays and are vectorized across them."""
+
+    def __init__(self, capacity):
+        self._depth = max(1, int(np.ceil(np.log2(capacity))))
+        self._num_leaves = 1 << self._depth
+        # Node 1 is the root; node i has children 2i and 2i+1; the leaves
+        # are nodes num_leaves .. 2 * num_leaves - 1.  Node 0 is unused.
+        self._tree = np.zeros(2 * self._num_leaves)
+
+    def total(self):
+        return self._tree[1]
+
+    def get(self, indices):
+        return self._tree[np.asarray(indices) + self._num_leaves]
+
+    def update(self, indices, priorities):
+        """Sets the priorities of leaves @p indices to @p priorities.  If an
+        index is repeated the last of its priorities is used."""
+        nodes = np.asarray(indices) + self._num_leaves
+        self._tree[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self._tree[nodes] = (self._tree[2 * nodes] +
+                                 self._tree[2 * nodes + 1])
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """@return, for each of @p values in [0, total()), the index of the
+        leaf in whose span of the cumulative priorities it falls.  Only
+        leaves of nonzero priority are returned (if any exist), even where
+        rounding in the sums would otherwise carry a value past the last of
+        them."""
+        values = np.asarray(values, dtype=float)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self._depth):
+            left = 2 * nodes
+            left_sum = self._tree[left]
+            go_right = (((values >= left_sum) & (self._tree[left + 1] > 0))
+                        | (left_sum <= 0))
+            values = values - np.where(go_right, left_sum, 0)
+            nodes = left + go_right
+        return nodes - self._num_leaves
+
+
+class PrioritizedReplay(object):
+    """A bounded buffer of (example, score) pairs sampled in proportion to
+    (error + epsilon) ** alpha, with importance weights of exponent beta.
+    When full, the oldest examples are overwritten."""
+
+    def __init__(self, capacity, alpha=0.6, beta=0.4, epsilon=1e-3):
+        self._capacity = capacity
+        self._alpha = alpha
+        self._beta = beta
+        self._epsilon = epsilon
+        self._tree = SumTree(capacity)
+        self._x = None
+        self._y = np.zeros(capacity)
+        self._size = 0
+        self._next = 0
+        self._max_priority = 1.
+
+    def __len__(self):
+        return self._size
+
+    def add(self, x, y):
+        """Adds the examples @p x (one per row) with scores @p y.  New
+        examples get the highest priority seen so far, so that each is
+        likely to be sampled (and so get a real priority) soon."""
+        if self._x is None:
+            self._x = np.zeros((self._capacity,) + x.shape[1:],
+                               dtype=x.dtype)
+        indices = (self._next + np.arange(len(x))) % self._capacity
+        self._x[indices] = x
+        self._y[indices] = y
+        self._tree.update(indices, self._max_priority)
+        self._next = (self._next + len(x)) % self._capacity
+        self._size = min(self._size + len(x), self._capacity)
+
+    def add_dataset(self, dataset):
+        """Adds every example of the data.Dataset @p dataset."""
+        for x, y in zip(dataset.example_batches(), dataset.score_batches()):
+            if len(x):
+                self.add(x, y)
+
+    def sample(self, batch_size, rng=np.random):
+        """Draws @p batch_size examples, one from each of @p batch_size equal
+        slices of the total priority.
+
+        @return (indices, x, y, weights), where weights are the normalized
+        importance-sampling weights to apply to each example's loss."""
+        assert self._size, "cannot sample from an empty replay buffer"
+        total = self._tree.total()
+        values = ((np.arange(batch_size) + rng.uniform(size=batch_size))
+                  * total / batch_size)
+        indices = self._tree.find(values)
+        probabilities = self._tree.get(indices) / total
+        weights = (self._size * probabilities) ** -self._beta
+        weights /= weights.max()
+        return indices, self._x[indices], self._y[indices], weights
+
+    def update_priorities(self, indices, errors):
+        """Sets the priorities of the examples at @p indices from their
+        latest training @p errors."""
+        priorities = (np.abs(errors) + self._epsilon) ** self._alpha
+        self._max_priority = max(self._max_priority, priorities.max())
+        self._tree.update(indices, priorities)
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+"""A single orchestrated self-play training loop, replacing the hand-chained
+data.py / model.py / demo.py steps of the Makefile.
+
+Everything lives in a working directory:
+ * Generator worker processes repeatedly play games with the current best
+   checkpoint (or randomly, before there is one) and drop each batch of
+   examples there as a dataset shard.
+ * The trainer (the main process) picks up shards as they appear, keeps the
+   most recent few in a bounded replay window, and trains a candidate model
+   on that window.
+ * Every few rounds a snapshot of the candidate is evaluated in a separate
+   process against the score of the best checkpoint, and promoted to be the
+   new best checkpoint (which the generators then pick up) if it is
+   confidently better within a bounded number of games.  A best checkpoint
+   left by an earlier run, or copied from the model training transfers
+   from, is evaluated first, so that it is only ever replaced by a better
+   one.
+
+Generation, training and evaluation thus all overlap rather than each
+waiting for the previous step to finish."""
+
+import argparse
+import collections
+import glob
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import time
+
+from strategy.basic import RandomStrategy
+from strategy.nn.data import Dataset
+from strategy.strategy_evaluator import StrategyEvaluator
+from strategy.telemetry import (Telemetry, TelemetryAggregator,
+                                add_telemetry_arguments,
+                                start_telemetry_reporting)
+
+BEST_MODEL = "best.hdf5"
+CANDIDATE_MODEL = "candidate.hdf5"
+SHARD_DIR = "shards"
+POLL_SECONDS = 1.
+# How long to wait for generators to finish their games on shutdown.
+STOP_SECONDS = 30.
+EVAL_MAX_GAMES = 300
+
+
+def _write_atomically(directory, filename, write_fn):
+    """Calls @p write_fn on a temporary name and then renames the result to
+    @p filename, so that readers never see a partly written file."""
+    base, extension = os.path.splitext(filename)
+    temporary = os.path.join(directory, base + ".tmp" + extension)
+    write_fn(temporary)
+    os.replace(temporary, os.path.join(directory, filename))
+
+
+def _generator_worker(work_dir, worker_index, shard_size, stop_event,
+                      telemetry_queue):
+    """Worker process body:  generate shards until @p stop_event is set,
+    reloading the best checkpoint whenever it changes, and publishing
+    telemetry to @p telemetry_queue."""
+    rnd = random.Random()
+    telemetry = Telemetry(telemetry_queue)
+    best_path = os.path.join(work_dir, BEST_MODEL)
+    shard_dir = os.path.join(work_dir, SHARD_DIR)
+    strategy, loaded_mtime = RandomStrategy(), None
+    shard_index = 0
+    while not stop_event.is_set():
+        if os.path.isfile(best_path):
+            mtime = os.path.getmtime(best_path)
+            if mtime != loaded_mtime:
+                # Imported here so that workers only load keras once there
+                # is a model to play.
+                from strategy.nn.nn_strategy import ModelStrategy
+                strategy, loaded_mtime = ModelStrategy(best_path), mtime
+        dataset = Dataset()
+        dataset.add_n_examples(strategy, rnd, shard_size,
+                               telemetry=telemetry, stop_event=stop_event)
+        if stop_event.is_set():
+            break
+        _write_atomically(shard_dir,
+                          "shard_w%02d_%06d.npz" % (worker_index, shard_index),
+                          dataset.save)
+        shard_index += 1
+    telemetry.publish()
+
+
+def _evaluate_checkpoint(model_file, reference, max_games):
+    """Evaluation process body.  @return the SequentialResult of
+    @p model_file against @p reference (or to a fixed precision if there is
+    no reference yet), after at most @p max_games games."""
+    from strategy.nn.nn_strategy import ModelStrategy
+    evaluator = StrategyEvaluator(ModelStrategy(model_file))
+    if reference is None:
+        return evaluator.evaluate_sequential(precision=50,
+                                             max_runs=max_games)
+    return evaluator.evaluate_sequential(reference=reference,
+                                         max_runs=max_games)
+
+
+class SelfPlayTrainer(object):
+    """The trainer side of the loop; see the module docstring."""
+
+    def __init__(self, work_dir, replay_shards, epochs_per_round,
+                 eval_period, transfer_from=None,
+                 eval_max_games=EVAL_MAX_GAMES, model=None):
+        """If @p transfer_from is set, training starts from that model, which
+        also becomes the best checkpoint if @p work_dir has none yet.  If
+        @p model is set, it is trained instead, and must be compiled."""
+        self._work_dir = work_dir
+        self._shard_dir = os.path.join(work_dir, SHARD_DIR)
+        os.makedirs(self._shard_dir, exist_ok=True)
+        self._best_path = os.path.join(work_dir, BEST_MODEL)
+        if transfer_from and not os.path.isfile(self._best_path):
+            shutil.copyfile(transfer_from, self._best_path)
+        self._replay = collections.deque()  # of (filename, Dataset)
+        self._replay_shards = replay_shards
+        self._epochs_per_round = epochs_per_round
+        self._eval_period = eval_period
+        self._eval_max_games = eval_max_games
+        self._seen_shards = set()
+        self._best_score = None
+        # (snapshot filename, or None for the best checkpoint; AsyncResult)
+        self._pending_eval = None
+        if model is None:
+            # Imported here so that this module loads without keras.
+            import keras as k
+            from strategy.nn.model import compile_model, make_model
+            if transfer_from:
+                model = k.models.load_model(transfer_from)
+            else:
+                model = make_model()
+            compile_model(model)
+        self._model = model
+
+    def _take_new_shards(self):
+        """Moves any newly finished shards into the replay window, evicting
+        (and deleting) the oldest ones beyond its size.  @return the
+        number of new shards."""
+        new_shards = sorted(
+            f for f in glob.glob(os.path.join(self._shard_dir, "*.npz"))
+            if not f.endswith(".tmp.npz") and f not in self._seen_shards)
+        for filename in new_shards:
+            self._seen_shards.add(filename)
+            self._replay.append((filename, Dataset.load(filename)))
+        while len(self._replay) > self._replay_shards:
+            filename, _ = self._replay.popleft()
+            os.remove(filename)
+        return len(new_shards)
+
+    def _train_round(self):
+        from strategy.nn.model import model_input, training_arrays
+        window = Dataset()
+        for _, dataset in self._replay:
+            window.add_dataset(dataset)
+        x, y = training_arrays(window)
+        self._model.fit(model_input(self._model, x), y,
+                        epochs=self._epochs_per_round, verbose=0)
+        self._model.save(os.path.join(self._work_dir, CANDIDATE_MODEL))
+
+    def _start_evaluation(self, pool, round_number):
+        snapshot = os.path.join(self._work_dir,
+                                "candidate_%06d.hdf5" % round_number)
+        shutil.copyfile(os.path.join(self._work_dir, CANDIDATE_MODEL),
+                        snapshot)
+        self._pending_eval = (snapshot, pool.apply_async(
+            _evaluate_checkpoint,
+            (snapshot, self._best_score, self._eval_max_games)))
+
+    def _start_best_evaluation(self, pool):
+        """Scores the existing best checkpoint, as the reference for the
+        first snapshot."""
+        self._pending_eval = (None, pool.apply_async(
+            _evaluate_checkpoint,
+            (self._best_path, None, self._eval_max_games)))
+
+    def _finish_evaluation(self):
+        """If an evaluation has finished, promote or discard its snapshot.
+        A snapshot is only promoted if it is confidently better than the
+        best checkpoint (a verdict of 0, when the evaluation ran out of
+        games, does not promote it), or if there is no best checkpoint."""
+        snapshot, async_result = self._pending_eval
+        if not async_result.ready():
+            return
+        self._pending_eval = None
+        result = async_result.get()
+        print("%s scored %f (95%% CI %f to %f) in %d games" %
+              ("Snapshot " + snapshot if snapshot else "Best checkpoint",
+               result.mean, result.low, result.high, result.num_runs))
+        if snapshot is None:
+            self._best_score = result.mean
+        elif self._best_score is None or result.verdict > 0:
+            print("...promoting it to best checkpoint.")
+            self._best_score = result.mean
+            os.replace(snapshot, self._best_path)
+        else:
+            os.remove(snapshot)
+
+    def run(self, num_rounds, eval_pool):
+        round_number = 0
+        if self._best_score is None and os.path.isfile(self._best_path):
+            self._start_best_evaluation(eval_pool)
+        while round_number < num_rounds:
+            if self._pending_eval:
+                self._finish_evaluation()
+            if not self._take_new_shards():
+                time.sleep(POLL_SECONDS)
+                continue
+            self._train_round()
+            round_number += 1
+            print("Finished training round %d on %d shards" %
+                  (round_number, len(self._replay)))
+            if not (round_number % self._eval_period) \
+                    and not self._pending_eval:
+                self._start_evaluation(eval_pool, round_number)
+        if self._pending_eval:
+            self._pending_eval[1].wait()
+            self._finish_evaluation()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--work_dir', metavar='DIRECTORY', type=str,
+                        required=True,
+                        help="directory for shards and checkpoints")
+    parser.add_argument('--num_workers', type=int,
+                        default=max(1, multiprocessing.cpu_count() - 2),
+                        help="number of self-play generator processes")
+    parser.add_argument('--shard_size', type=int, default=20000,
+                        help="number of examples (at minimum) per shard")
+    parser.add_argument('--replay_shards', type=int, default=25,
+                        help="number of most recent shards to train on")
+    parser.add_argument('--epochs_per_round', type=int, default=1,
+                        help="training epochs over the window per round")
+    parser.add_argument('--eval_period', type=int, default=5,
+                        help="evaluate a candidate every this many rounds")
+    parser.add_argument('--eval_max_games', type=int,
+                        default=EVAL_MAX_GAMES,
+                        help=("games after which an evaluation that has not "
+                              "shown a candidate to be better rejects it"))
+    parser.add_argument('--rounds', type=int, default=100,
+                        help="number of training rounds to run")
+    parser.add_argument('--transfer_from', metavar='FILENAME', type=str,
+                        help="if set, start training from this model")
+    add_telemetry_arguments(parser)
+    args = parser.parse_args(argv[1:])
+
+    # Keras does not survive being forked, so start clean processes.
+    context = multiprocessing.get_context("spawn")
+    trainer = SelfPlayTrainer(args.work_dir, args.replay_shards,
+                              args.epochs_per_round, args.eval_period,
+                              args.transfer_from, args.eval_max_games)
+    stop_event = context.Event()
+    aggregator = TelemetryAggregator(context)
+    reporters = start_telemetry_reporting(args, aggregator)
+    workers = [context.Process(target=_generator_worker,
+                               args=(args.work_dir, i, args.shard_size,
+                                     stop_event, aggregator.queue()))
+               for i in range(args.num_workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        with context.Pool(1) as eval_pool:
+            trainer.run(args.rounds, eval_pool)
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(STOP_SECONDS)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        # Shards that terminated workers were writing.
+        for partial in glob.glob(os.path.join(args.work_dir, SHARD_DIR,
+                                              "*.tmp.npz")):
+            os.remove(partial)
+        for reporter in reporters:
+            reporter.stop()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
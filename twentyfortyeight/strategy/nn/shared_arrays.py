@@ -0,0 +1,58 @@
+"""Numpy arrays in shared memory, for handing large or frequently updated
+arrays to worker processes without pickling their contents.
+
+Requires python 3.8 or later, for multiprocessing.shared_memory."""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Each array starts at a multiple of this many bytes, so that none is
+# misaligned for its dtype.
+_ALIGNMENT = 64
+
+
+class SharedArrays(object):
+    """Named numpy arrays copied into one block of shared memory.  Pickling
+    an instance passes only the name of the block, so that processes it is
+    sent to map the same memory."""
+
+    def __init__(self, arrays):
+        """@p arrays is a dict of name to the initial numpy array."""
+        self._specs = []  # (name, dtype, shape, offset)
+        size = 0
+        for name, array in arrays.items():
+            self._specs.append((name, array.dtype.str, array.shape, size))
+            size += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._owner = True
+        self._map_arrays()
+        for name, array in arrays.items():
+            self._arrays[name][...] = array
+
+    def _map_arrays(self):
+        self._arrays = {
+            name: np.ndarray(shape, dtype=np.dtype(dtype),
+                             buffer=self._shm.buf, offset=offset)
+            for name, dtype, shape, offset in self._specs}
+
+    def __getstate__(self):
+        return self._shm.name, self._specs
+
+    def __setstate__(self, state):
+        name, self._specs = state
+        self._shm = shared_memory.SharedMemory(name=name)
+        self._owner = False
+        self._map_arrays()
+
+    def __getitem__(self, name):
+        return self._arrays[name]
+
+    def close(self):
+        """Detaches from the shared memory, freeing it if this is the
+        process that created it.  The caller must first drop any other
+        references to the arrays."""
+        self._arrays = {}
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
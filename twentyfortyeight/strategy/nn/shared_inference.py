@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+"""Many cheap game-playing processes sharing one model process.
+
+Running ModelStrategy in every process of a pool makes every process load
+TensorFlow and the model; sending boards to a single model process through
+queues pays for pickling on every move.  Instead, game workers here write
+their candidate boards, packed to a uint64 apiece, into a block of shared
+memory, and a single inference process scores all outstanding requests in
+one batch and writes the scores back in place.
+
+Each worker owns one slot of the exchange and has at most one request
+outstanding, so slots need no locking:  a worker fills its slot, flags it
+and wakes the server through a semaphore shared by all slots; the server
+collects the flagged slots and, once it has written the scores, wakes each
+worker through the slot's own semaphore.  The semaphores also order each
+side's writes to the slots before the other side's reads of them, so the
+exchange does not rely on the processor keeping stores in order.  Nothing
+is pickled after startup."""
+
+import argparse
+import multiprocessing
+import sys
+import threading
+
+import numpy as np
+
+from game.board import unpack_exponents
+from game.common import DIRECTIONS
+from game.game import Game
+from strategy.nn.shared_arrays import SharedArrays
+from strategy.strategy import Strategy
+from strategy.strategy_evaluator import play_game
+
+# Slot states.
+IDLE, REQUEST, RESPONSE = range(3)
+NUM_DIRECTIONS = len(DIRECTIONS)
+
+
+class BoardExchange(object):
+    """Shared memory holding, for each of @p num_slots slots, a state flag,
+    the packed afterstate board of each move, whether each move is legal,
+    and the score of each move.  It may only be passed to processes of the
+    multiprocessing @p context (by default, the default context)."""
+
+    _ARRAYS = ("stop_flag", "boards", "scores", "states", "legal")
+
+    def __init__(self, num_slots, context=None):
+        context = context or multiprocessing.get_context()
+        self._num_slots = num_slots
+        self._shared = SharedArrays({
+            "stop_flag": np.zeros(1, dtype=np.int64),
+            "boards": np.zeros((num_slots, NUM_DIRECTIONS), dtype=np.uint64),
+            "scores": np.zeros((num_slots, NUM_DIRECTIONS), dtype=np.float32),
+            "states": np.full(num_slots, IDLE, dtype=np.int32),
+            "legal": np.zeros((num_slots, NUM_DIRECTIONS), dtype=np.bool_)})
+        self._semaphores = [context.Semaphore(0)
+                            for _ in range(num_slots)]
+        # Released once per request, and once on stop.
+        self._work = context.Semaphore(0)
+        self._map_arrays()
+
+    def _map_arrays(self):
+        for name in self._ARRAYS:
+            setattr(self, name, self._shared[name])
+
+    def __getstate__(self):
+        return self._shared, self._num_slots, self._semaphores, self._work
+
+    def __setstate__(self, state):
+        (self._shared, self._num_slots, self._semaphores,
+         self._work) = state
+        self._map_arrays()
+
+    def num_slots(self):
+        return self._num_slots
+
+    def evaluate(self, slot, packed_boards, legal):
+        """Worker side:  request scores for the @p packed_boards in @p slot
+        and block until the server has written them.  @return the scores,
+        -inf for moves not marked @p legal."""
+        self.boards[slot] = packed_boards
+        self.legal[slot] = legal
+        self.states[slot] = REQUEST
+        self._work.release()
+        self._semaphores[slot].acquire()
+        scores = self.scores[slot].copy()
+        self.states[slot] = IDLE
+        return scores
+
+    def pending_slots(self):
+        """Server side:  @return the slots with outstanding requests."""
+        return np.flatnonzero(self.states == REQUEST)
+
+    def wait_for_requests(self, timeout=None):
+        """Server side:  block until a request arrives or the exchange is
+        stopped, or for at most @p timeout seconds if given.  @return the
+        slots with outstanding requests, which may be none."""
+        if not self._work.acquire(timeout=timeout):
+            return self.pending_slots()
+        # Take the wakeups of all requests made so far, which this batch
+        # will answer; a wakeup for a request answered early is harmless.
+        while self._work.acquire(False):
+            pass
+        return self.pending_slots()
+
+    def respond(self, slots, scores):
+        """Server side:  deliver @p scores, a (len(slots), NUM_DIRECTIONS)
+        array, to the workers waiting on @p slots."""
+        self.scores[slots] = np.where(self.legal[slots], scores, -np.inf)
+        self.states[slots] = RESPONSE
+        for slot in slots:
+            self._semaphores[slot].release()
+
+    def stop(self):
+        self.stop_flag[0] = 1
+        self._work.release()
+
+    def stopped(self):
+        return bool(self.stop_flag[0])
+
+    def close(self):
+        """Detaches from the shared memory, freeing it if this is the
+        process that created it."""
+        for name in self._ARRAYS:
+            delattr(self, name)
+        self._shared.close()
+
+
+class SharedModelStrategy(Strategy):
+    """A strategy equivalent to ModelStrategy that has the model process
+    score its candidate moves through slot @p slot of a BoardExchange."""
+
+    def __init__(self, exchange, slot):
+        self._exchange = exchange
+        self._slot = slot
+
+    def get_move(self, board, score):
+        packed = np.zeros(NUM_DIRECTIONS, dtype=np.uint64)
+        legal = np.zeros(NUM_DIRECTIONS, dtype=np.bool_)
+        for direction in DIRECTIONS:
+            rotated = board
+            for _ in range(direction):
+                rotated = rotated.rotate_cw()
+            changed, _, smashed = rotated.smash_up()
+            legal[direction] = changed
+            packed[direction] = smashed.as_packed()
+        scores = self._exchange.evaluate(self._slot, packed, legal)
+        return DIRECTIONS[int(np.argmax(scores))]
+
+
+class InferenceServer(object):
+    """Scores requests from all slots of a BoardExchange with one model."""
+
+    def __init__(self, exchange, model_filename):
+        # Imported here so that game workers never load keras.
+        import keras as k
+        from strategy.nn.model import model_input
+        self._exchange = exchange
+        self._model = k.models.load_model(model_filename)
+        self._model_input = model_input
+        self._batches = 0
+        self._requests = 0
+
+    def serve(self):
+        """Serves requests until the exchange is stopped."""
+        while not self._exchange.stopped():
+            slots = self._exchange.wait_for_requests()
+            if not len(slots):
+                continue
+            tiles = unpack_exponents(self._exchange.boards[slots].flatten())
+            predictions = self._model.predict_on_batch(
+                self._model_input(self._model, tiles))
+            self._exchange.respond(
+                slots, np.reshape(predictions, (len(slots), NUM_DIRECTIONS)))
+            self._batches += 1
+            self._requests += len(slots)
+
+    def mean_batch_size(self):
+        return self._requests / max(1, self._batches)
+
+
+def _game_worker(exchange, slot, game_numbers, results):
+    """Worker process body:  play a game for each item of the queue
+    @p game_numbers until it yields None, putting each score on the queue
+    @p results."""
+    strategy = SharedModelStrategy(exchange, slot)
+    for _ in iter(game_numbers.get, None):
+        score, _, _ = play_game(strategy, Game())
+        results.put(score)
+    exchange.close()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model_file', metavar='FILENAME', type=str,
+                        required=True, help="keras model file to play with")
+    parser.add_argument('--num_workers', type=int,
+                        default=multiprocessing.cpu_count(),
+                        help="number of game-playing processes")
+    parser.add_argument('--number_of_games', type=int, default=100,
+                        help="number of games to run")
+    args = parser.parse_args(argv[1:])
+
+    context = multiprocessing.get_context("spawn")
+    exchange = BoardExchange(args.num_workers, context)
+    game_numbers, results = context.Queue(), context.Queue()
+    for i in range(args.number_of_games):
+        game_numbers.put(i)
+    workers = [context.Process(target=_game_worker,
+                               args=(exchange, slot, game_numbers, results))
+               for slot in range(args.num_workers)]
+    for worker in workers:
+        game_numbers.put(None)
+        worker.start()
+    server = InferenceServer(exchange, args.model_file)
+
+    scores = []
+
+    def collect_scores():
+        scores.extend(results.get() for _ in range(args.number_of_games))
+        exchange.stop()
+
+    collector = threading.Thread(target=collect_scores)
+    collector.start()
+    server.serve()
+    collector.join()
+    for worker in workers:
+        worker.join()
+    exchange.close()
+    print("Model %s had average score %f after %d games "
+          "(mean inference batch %f boards)" %
+          (args.model_file, sum(scores) / len(scores), len(scores),
+           server.mean_batch_size() * NUM_DIRECTIONS))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,88 @@
+"""A stratified index over a dataset of starting positions, so that data
+generation can start games from late-game positions far more often than
+they occur in the dataset.
+
+Positions are bucketed by their largest tile, their number of empty cells
+and their depth (moves since the start of their game), with dead positions
+dropped up front.  Sampling then picks a stratum with probability in
+proportion to its weight and a position uniformly within it."""
+
+import bisect
+
+import numpy as np
+
+from game.board import Board, exponents_can_move
+
+# Bucket boundaries:  a value v falls in bucket i if
+# EDGES[i - 1] <= v < EDGES[i].
+EMPTY_BUCKET_EDGES = [2, 5, 9]
+DEPTH_BUCKET_EDGES = [50, 150, 400, 1000]
+
+
+def game_depths(scores):
+    """@return the depth of each example of a dataset, given its @p scores.
+
+    Datasets do not record game boundaries, but Dataset.evaluate_states
+    scores each game's examples with its moves remaining, counting down by
+    one; a new game starts wherever the count does not.  Depths of games
+    started from a starting position are counted from that position."""
+    scores = np.asarray(scores, dtype=np.int64)
+    starts = np.ones(len(scores), dtype=bool)
+    starts[1:] = scores[1:] != scores[:-1] - 1
+    start_scores = scores[starts][np.cumsum(starts) - 1]
+    return start_scores - scores
+
+
+class StartingPositionIndex(object):
+    """An index of the live positions of a Dataset, by stratum; strata are
+    tuples (max tile exponent, empty cell bucket, depth bucket)."""
+
+    def __init__(self, dataset):
+        examples = np.concatenate(dataset.example_batches())
+        scores = np.concatenate(dataset.score_batches())
+        live = np.flatnonzero(exponents_can_move(examples))
+        self._examples = examples[live]
+        strata = np.stack([
+            self._examples.max(axis=1),
+            np.digitize((self._examples == 0).sum(axis=1),
+                        EMPTY_BUCKET_EDGES),
+            np.digitize(game_depths(scores)[live], DEPTH_BUCKET_EDGES)],
+            axis=1)
+        unique_strata, inverse, counts = np.unique(
+            strata, axis=0, return_inverse=True, return_counts=True)
+        self._strata = [tuple(int(v) for v in stratum)
+                        for stratum in unique_strata]
+        self._counts = counts
+        # Positions sorted by stratum, with each stratum's first offset.
+        self._order = np.argsort(inverse.reshape(-1), kind="stable")
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.set_weights(lambda stratum: 1.)
+
+    def num_positions(self):
+        return len(self._examples)
+
+    def strata(self):
+        """@return a list of (stratum, number of positions in it)."""
+        return list(zip(self._strata, self._counts.tolist()))
+
+    def set_weights(self, weight_fn):
+        """Sets the weight of each stratum to @p weight_fn(stratum).  By
+        default all strata are weighted equally, however few positions they
+        hold."""
+        weights = np.array([weight_fn(stratum) for stratum in self._strata],
+                           dtype=float)
+        self._cumulative_weights = list(np.cumsum(weights) / weights.sum())
+
+    def sample(self, rnd):
+        """@return a position (a row of tile exponents) drawn with the random
+        source @p rnd."""
+        stratum = min(bisect.bisect_right(self._cumulative_weights,
+                                          rnd.random()),
+                      len(self._strata) - 1)
+        position = self._offsets[stratum] + rnd.randrange(
+            int(self._counts[stratum]))
+        return self._examples[self._order[position]]
+
+    def sample_board(self, rnd):
+        """@return the position drawn by sample(@p rnd), as a Board."""
+        return Board.from_vector(self.sample(rnd))
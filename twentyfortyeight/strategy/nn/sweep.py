@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+"""A parallel hyperparameter sweep over the HPARAMS of model.py.
+
+The dataset is loaded once, as the compact uint8 tile exponents that
+model_input passes straight to a compact-input model, into a block of
+shared memory that every trial process maps rather than copies.  Trials
+run concurrently in a pool of processes, each of which bounds the thread
+pools of TensorFlow so that the trials running at once share the cores
+rather than fighting over them.
+
+Losing trials are stopped early by successive halving:  every trial trains
+for a few epochs, then only the best 1/eta of them by validation loss train
+on to eta times as many epochs, and so on until one trial is left or the
+epoch budget is spent.  Every trial's result in every round is appended to
+a tab-separated result table as it completes."""
+
+import argparse
+import glob
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from strategy.nn.data import Dataset
+from strategy.nn.shared_arrays import SharedArrays
+
+VALIDATION_FRACTION = 0.1
+RESULT_COLUMNS = ("round", "trial", "conv_channels", "dense_sizes",
+                  "tile_embedding", "epochs", "val_loss", "val_mae",
+                  "seconds")
+
+
+def load_shared_data(filename, validation_fraction=VALIDATION_FRACTION):
+    """@return SharedArrays of the shuffled examples of the dataset in
+    @p filename, split into "x_train", "y_train", "x_validation" and
+    "y_validation".  (This is training_arrays, done without loading keras
+    into the sweep's main process.)"""
+    dataset = Dataset.load(filename)
+    dataset.collapse()
+    x = dataset.example_batches()[0]
+    y = dataset.score_batches()[0]
+    order = np.random.permutation(len(y))
+    num_validation = int(len(y) * validation_fraction)
+    validation, train = order[:num_validation], order[num_validation:]
+    return SharedArrays({"x_train": x[train], "y_train": y[train],
+                         "x_validation": x[validation],
+                         "y_validation": y[validation]})
+
+
+def halving_schedule(num_trials, min_epochs, max_epochs, eta):
+    """@return a list of (number of trials, total epochs trained) for each
+    round of successive halving of @p num_trials trials, starting at
+    @p min_epochs and keeping the best 1/@p eta of the trials while
+    multiplying their epochs by @p eta, up to @p max_epochs."""
+    schedule = [(num_trials, min(min_epochs, max_epochs))]
+    while schedule[-1][0] > 1 and schedule[-1][1] < max_epochs:
+        survivors, epochs = schedule[-1]
+        schedule.append((max(1, survivors // eta),
+                         min(epochs * eta, max_epochs)))
+    return schedule
+
+
+_worker_data = None
+
+
+def _init_worker(data, threads):
+    """Pool initializer:  keep the SharedArrays @p data, and bound
+    TensorFlow to @p threads threads before it starts any."""
+    global _worker_data
+    _worker_data = data
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+
+def _run_trial(trial, hparams, epochs, checkpoint):
+    """Pool task:  train trial @p trial for @p epochs more epochs, starting
+    from the model file @p checkpoint if it exists and from a new model with
+    @p hparams otherwise, and save it back.  @return (trial, validation
+    loss, validation mean absolute error, seconds taken)."""
+    import keras as k
+    from strategy.nn.model import compile_model, make_model, model_input
+    start = time.time()
+    k.backend.clear_session()
+    if os.path.isfile(checkpoint):
+        model = k.models.load_model(checkpoint)
+    else:
+        model = make_model(hparams)
+        compile_model(model)
+    model.fit(model_input(model, _worker_data["x_train"]),
+              _worker_data["y_train"], epochs=epochs, verbose=0)
+    loss, mae = model.evaluate(
+        model_input(model, _worker_data["x_validation"]),
+        _worker_data["y_validation"], verbose=0)
+    model.save(checkpoint)
+    return trial, float(loss), float(mae), time.time() - start
+
+
+class SweepRunner(object):
+    """Runs successive halving over the list of HPARAMS overrides
+    @p trials, keeping each trial's model in @p work_dir.  Trial models
+    left in @p work_dir by an earlier sweep are deleted, as trials resume
+    from their models between rounds and would otherwise resume from
+    models of different hyperparameters.  Progress is printed if
+    @p verbose."""
+
+    def __init__(self, trials, work_dir, results_filename, verbose=True):
+        self._trials = trials
+        self._work_dir = work_dir
+        self._results_filename = results_filename
+        self._verbose = verbose
+        os.makedirs(work_dir, exist_ok=True)
+        for stale in glob.glob(os.path.join(work_dir, "trial_*.hdf5")):
+            if verbose:
+                print("Removing trial model from an earlier sweep:", stale)
+            os.remove(stale)
+
+    def checkpoint(self, trial):
+        return os.path.join(self._work_dir, "trial_%03d.hdf5" % trial)
+
+    def _write_row(self, results, row):
+        results.write("\t".join(str(value) for value in row) + "\n")
+        results.flush()
+
+    def run(self, pool, min_epochs, max_epochs, eta):
+        """Runs the sweep with trials in @p pool.  @return a list of
+        (validation loss, trial) for the trials of the final round, best
+        first."""
+        survivors = list(range(len(self._trials)))
+        epochs_done = 0
+        with open(self._results_filename, "w") as results:
+            self._write_row(results, RESULT_COLUMNS)
+            for round_number, (num_trials, epochs) in enumerate(
+                    halving_schedule(len(survivors), min_epochs, max_epochs,
+                                     eta)):
+                survivors = survivors[:num_trials]
+                if self._verbose:
+                    print("Round %d: %d trials to %d epochs" %
+                          (round_number, len(survivors), epochs))
+                ranked = []
+                tasks = [(trial, self._trials[trial], epochs - epochs_done,
+                          self.checkpoint(trial)) for trial in survivors]
+                for trial, loss, mae, seconds in pool.imap_unordered(
+                        _star_run_trial, tasks):
+                    hparams = self._trials[trial]
+                    self._write_row(results, (
+                        round_number, trial, hparams["conv_channels"],
+                        ",".join(str(size)
+                                 for size in hparams["dense_sizes"]),
+                        hparams["tile_embedding"], epochs, loss, mae,
+                        "%.1f" % seconds))
+                    ranked.append((loss, trial))
+                ranked.sort()
+                survivors = [trial for _, trial in ranked]
+                epochs_done = epochs
+        return ranked
+
+
+def _star_run_trial(task):
+    return _run_trial(*task)
+
+
+def _parse_sizes(text):
+    return [int(size) for size in text.split(",")]
+
+
+def _parse_embedding(text):
+    return None if text.lower() == "none" else int(text)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--training_data', metavar='FILENAME', type=str,
+                        required=True, help='npz file containing training data')
+    parser.add_argument('--work_dir', metavar='DIRECTORY', type=str,
+                        required=True,
+                        help="directory for trial models and results")
+    parser.add_argument('--conv_channels', type=int, nargs='+',
+                        default=[16, 30, 64],
+                        help="values of conv_channels to try")
+    parser.add_argument('--dense_sizes', type=_parse_sizes, nargs='+',
+                        default=[[100, 50, 25], [200, 100], [256, 64, 16]],
+                        metavar='SIZE,SIZE,...',
+                        help="values of dense_sizes to try")
+    parser.add_argument('--tile_embedding', type=_parse_embedding, nargs='+',
+                        default=[None], metavar='WIDTH',
+                        help="values of tile_embedding ('none' for one-hot)")
+    parser.add_argument('--min_epochs', type=int, default=1,
+                        help="epochs every trial trains for")
+    parser.add_argument('--max_epochs', type=int, default=27,
+                        help="epochs the best trials train for")
+    parser.add_argument('--eta', type=int, default=3,
+                        help="keep the best 1/eta of trials each round")
+    parser.add_argument('--threads_per_trial', type=int, default=2,
+                        help="TensorFlow threads per concurrent trial")
+    parser.add_argument('--processes', type=int, default=None,
+                        help=("concurrent trials; by default, as many as "
+                              "fit on the cores at --threads_per_trial"))
+    parser.add_argument('--results', metavar='FILENAME', type=str,
+                        help="result table (default WORK_DIR/results.tsv)")
+    args = parser.parse_args(argv[1:])
+
+    trials = [{"conv_channels": conv_channels, "dense_sizes": dense_sizes,
+               "tile_embedding": tile_embedding}
+              for conv_channels, dense_sizes, tile_embedding
+              in itertools.product(args.conv_channels, args.dense_sizes,
+                                   args.tile_embedding)]
+    processes = args.processes or max(
+        1, multiprocessing.cpu_count() // args.threads_per_trial)
+    runner = SweepRunner(trials, args.work_dir,
+                         args.results or os.path.join(args.work_dir,
+                                                      "results.tsv"))
+    data = load_shared_data(args.training_data)
+    # Spawned workers import TensorFlow afresh, after _init_worker has
+    # bounded its threads.
+    context = multiprocessing.get_context("spawn")
+    try:
+        with context.Pool(min(processes, len(trials)),
+                          initializer=_init_worker,
+                          initargs=(data, args.threads_per_trial)) as pool:
+            ranked = runner.run(pool, args.min_epochs, args.max_epochs,
+                                args.eta)
+    finally:
+        data.close()
+    loss, best = ranked[0]
+    print("Best trial %d (validation loss %f): %s in %s" %
+          (best, loss, trials[best], runner.checkpoint(best)))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
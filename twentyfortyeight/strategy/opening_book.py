@@ -0,0 +1,164 @@
+"""An opening book:  a persistent record of the moves a strategy chose in
+early-game positions, so that expensive strategies need not re-solve the
+same few openings in every game.
+
+Positions are stored under a canonical form (the least packed encoding
+among the board's eight rotations and reflections), so each book entry
+serves every symmetric variant of its position.
+
+Note that the book replays the first move the wrapped strategy chose in a
+position; it is only appropriate for strategies that are deterministic in
+the board."""
+
+import os
+
+import numpy as np
+
+from game.common import HEIGHT, WIDTH
+from strategy.strategy import Strategy
+
+# The default book depth, as a sum of tile values; each turn adds a 2 or a
+# 4, so this is roughly the first 50 moves.
+DEFAULT_MAX_TILE_SUM = 128
+
+# Unit vectors of the directions, in screen coordinates (y increasing down).
+_DIRECTION_VECTORS = [(0, -1), (-1, 0), (0, 1), (1, 0)]
+
+
+def _make_symmetries():
+    """@return a list of (cell permutation, direction map) for the eight
+    symmetries of the board.  Applying a symmetry to a board moves the cell
+    at packed index i to packed index permutation[i]; a move d on the
+    original board is equivalent to the move direction_map[d] on the
+    transformed board."""
+    assert WIDTH == HEIGHT, "board symmetries require a square board"
+    symmetries = []
+    for a, b, c, d in [(1, 0, 0, 1), (0, -1, 1, 0), (-1, 0, 0, -1),
+                       (0, 1, -1, 0), (-1, 0, 0, 1), (1, 0, 0, -1),
+                       (0, 1, 1, 0), (0, -1, -1, 0)]:
+        permutation = []
+        for x in range(WIDTH):
+            for y in range(HEIGHT):
+                # Transform about the center of the board.
+                cx, cy = 2 * x - (WIDTH - 1), 2 * y - (HEIGHT - 1)
+                new_x = (a * cx + b * cy + (WIDTH - 1)) // 2
+                new_y = (c * cx + d * cy + (HEIGHT - 1)) // 2
+                permutation.append(new_x * HEIGHT + new_y)
+        direction_map = [_DIRECTION_VECTORS.index((a * dx + b * dy,
+                                                   c * dx + d * dy))
+                         for (dx, dy) in _DIRECTION_VECTORS]
+        symmetries.append((permutation, direction_map))
+    return symmetries
+
+
+SYMMETRIES = _make_symmetries()
+
+
+def _permute_packed(packed, permutation):
+    result = 0
+    for i, new_i in enumerate(permutation):
+        result |= ((packed >> (4 * i)) & 0xF) << (4 * new_i)
+    return result
+
+
+def canonicalize(board):
+    """@return (key, direction_map):  the canonical packed key of @p board,
+    and the map from moves on @p board to moves on the canonical board."""
+    packed = board.as_packed()
+    return min((_permute_packed(packed, permutation), direction_map)
+               for permutation, direction_map in SYMMETRIES)
+
+
+def _is_legal(board, direction):
+    for _ in range(direction):
+        board = board.rotate_cw()
+    changed, _, _ = board.smash_up()
+    return changed
+
+
+class OpeningBookStrategy(Strategy):
+    """Wraps a strategy, answering early-game positions from a book and
+    recording the wrapped strategy's choices in positions not yet in it."""
+
+    def __init__(self, strategy, book_filename=None, max_tile_sum=None):
+        """Wraps @p strategy, consulting the book for boards whose tiles sum
+        to at most @p max_tile_sum.  If @p book_filename names an existing
+        book, it is loaded, along with the depth it was built at; save()
+        writes the book back to it.  @p max_tile_sum defaults to the
+        loaded book's depth, or DEFAULT_MAX_TILE_SUM for a new book."""
+        self._strategy = strategy
+        self._book_filename = book_filename
+        self._max_tile_sum = max_tile_sum
+        self._book = {}  # canonical packed board -> canonical move
+        self._hits = 0
+        self._misses = 0
+        self._beyond_book = 0
+        if book_filename and os.path.isfile(book_filename):
+            self.load(book_filename)
+        if self._max_tile_sum is None:
+            self._max_tile_sum = DEFAULT_MAX_TILE_SUM
+
+    def name(self):
+        return "OpeningBook(%s)" % self._strategy.name()
+
+    def get_move(self, board, score):
+        if sum(sum(column) for column in board.columns()) \
+                > self._max_tile_sum:
+            self._beyond_book += 1
+            return self._strategy.get_move(board, score)
+        key, direction_map = canonicalize(board)
+        book_move = self._book.get(key)
+        if book_move is not None:
+            self._hits += 1
+            return direction_map.index(book_move)
+        self._misses += 1
+        move = self._strategy.get_move(board, score)
+        # Illegal moves are not recorded, lest the book repeat them forever.
+        if _is_legal(board, move):
+            self._book[key] = direction_map[move]
+        return move
+
+    def notify_outcome(self, board, score):
+        self._strategy.notify_outcome(board, score)
+
+    def cacheable(self):
+        # The book grows from game to game, and its moves are those of
+        # earlier games rather than the wrapped strategy's in this one.
+        return False
+
+    def stats(self):
+        """@return a dict of the book size and the number of moves answered
+        from the book (hits), added to it (misses) and made beyond it."""
+        return {"size": len(self._book),
+                "hits": self._hits,
+                "misses": self._misses,
+                "beyond_book": self._beyond_book}
+
+    def save(self, filename=None):
+        """Writes the book, as parallel arrays of sorted packed boards and
+        their moves, to @p filename (by default the file it was loaded
+        from)."""
+        filename = filename or self._book_filename
+        assert(filename.endswith(".npz"))
+        keys = np.array(sorted(self._book), dtype=np.uint64)
+        moves = np.array([self._book[key] for key in sorted(self._book)],
+                         dtype=np.uint8)
+        with open(filename, "wb") as f:
+            np.savez(f, keys=keys, moves=moves,
+                     max_tile_sum=self._max_tile_sum)
+
+    def load(self, filename):
+        """Adds the book in @p filename to this one, adopting its depth.
+        Raises ValueError if this book already has a different depth, as
+        the two books' entries would then not cover the same positions."""
+        assert(filename.endswith(".npz"))
+        with open(filename, "rb") as f:
+            npz_data = np.load(f)
+            max_tile_sum = int(npz_data["max_tile_sum"])
+            if self._max_tile_sum not in (None, max_tile_sum):
+                raise ValueError(
+                    "Opening book %s was built to tile sum %d, not %d" %
+                    (filename, max_tile_sum, self._max_tile_sum))
+            self._max_tile_sum = max_tile_sum
+            self._book.update(zip(npz_data["keys"].tolist(),
+                                  npz_data["moves"].tolist()))
@@ -0,0 +1,236 @@
+"""Streaming statistics over game outcomes, for use by evaluators that do
+not want to keep every score in memory.
+
+Every collector here takes constant memory however many values it sees, and
+two collectors merge exactly:  merging the collectors of the parts of a
+stream gives the same result as one collector over the whole stream (up to
+floating point rounding in RunningStats)."""
+
+import math
+
+
+class RunningStats(object):
+    """Running mean and variance of a stream of numbers, maintained with
+    Welford's algorithm so that long runs do not lose precision.  Two
+    instances can be merged exactly (Chan et al.'s parallel update)."""
+
+    def __init__(self):
+        self._count = 0
+        self._mean = 0.
+        self._m2 = 0.  # Sum of squared deviations from the mean.
+
+    def add(self, value):
+        self._count += 1
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (value - self._mean)
+
+    def merge(self, other):
+        """Fold the values seen by @p other into this instance."""
+        if not other._count:
+            return
+        total = self._count + other._count
+        delta = other._mean - self._mean
+        self._m2 += (other._m2 +
+                     delta * delta * self._count * other._count / total)
+        self._mean += delta * other._count / total
+        self._count = total
+
+    def state(self):
+        """@return the state of this instance as a plain tuple, suitable for
+        sending to another process; see from_state()."""
+        return self._count, self._mean, self._m2
+
+    @staticmethod
+    def from_state(state):
+        stats = RunningStats()
+        stats._count, stats._mean, stats._m2 = state
+        return stats
+
+    def count(self):
+        return self._count
+
+    def mean(self):
+        return self._mean
+
+    def variance(self):
+        """@return the (unbiased) sample variance, or inf if fewer than two
+        values have been seen."""
+        if self._count < 2:
+            return float("inf")
+        return self._m2 / (self._count - 1)
+
+    def stderr(self):
+        """@return the standard error of the mean."""
+        if self._count < 2:
+            return float("inf")
+        return math.sqrt(self.variance() / self._count)
+
+    def confidence_interval(self, z=1.96):
+        """@return (low, high), the normal-approximation confidence interval
+        on the mean at @p z standard errors (1.96 is roughly 95%)."""
+        half_width = z * self.stderr()
+        return self._mean - half_width, self._mean + half_width
+
+
+class QuantileSketch(object):
+    """Approximate quantiles of a stream of non-negative numbers.  Values
+    are counted in logarithmic buckets (as in DDSketch), so every quantile
+    estimate is within a factor of 1 +/- @p relative_accuracy of a value
+    actually at that rank; memory grows only with the logarithm of the
+    range of values, and merging adds bucket counts, which is exact."""
+
+    def __init__(self, relative_accuracy=0.01):
+        self._relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets = {}  # bucket index -> count
+        self._zeros = 0
+        self._count = 0
+
+    def add(self, value, count=1):
+        self._count += count
+        if value <= 0:
+            self._zeros += count
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self._buckets[index] = self._buckets.get(index, 0) + count
+
+    def merge(self, other):
+        assert other._relative_accuracy == self._relative_accuracy, \
+            "Only sketches of the same accuracy merge exactly"
+        self._count += other._count
+        self._zeros += other._zeros
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+
+    def state(self):
+        return (self._relative_accuracy, self._zeros,
+                sorted(self._buckets.items()))
+
+    @staticmethod
+    def from_state(state):
+        relative_accuracy, zeros, buckets = state
+        sketch = QuantileSketch(relative_accuracy)
+        sketch._zeros = zeros
+        sketch._buckets = dict((index, count) for index, count in buckets)
+        sketch._count = zeros + sum(sketch._buckets.values())
+        return sketch
+
+    def count(self):
+        return self._count
+
+    def quantile(self, q):
+        """@return an estimate of the @p q quantile (0 <= q <= 1), or nan if
+        no values have been seen."""
+        if not self._count:
+            return float("nan")
+        rank = q * (self._count - 1)
+        seen = self._zeros
+        if rank < seen:
+            return 0.
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if rank < seen:
+                # The midpoint (in relative error) of the bucket's range.
+                return 2 * self._gamma ** index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self._buckets) / (self._gamma + 1)
+
+
+class GameStats(object):
+    """Summary statistics of a stream of game outcomes (score, max_tile,
+    num_moves):  the mean, variance and quantiles of scores and of move
+    counts, and the distribution of the largest tile reached."""
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, relative_accuracy=0.01):
+        self._scores = RunningStats()
+        self._score_sketch = QuantileSketch(relative_accuracy)
+        self._moves = RunningStats()
+        self._moves_sketch = QuantileSketch(relative_accuracy)
+        self._max_tiles = {}  # tile -> number of games
+
+    def add(self, score, max_tile, num_moves):
+        self._scores.add(score)
+        self._score_sketch.add(score)
+        self._moves.add(num_moves)
+        self._moves_sketch.add(num_moves)
+        self._max_tiles[max_tile] = self._max_tiles.get(max_tile, 0) + 1
+
+    def merge(self, other):
+        self._scores.merge(other._scores)
+        self._score_sketch.merge(other._score_sketch)
+        self._moves.merge(other._moves)
+        self._moves_sketch.merge(other._moves_sketch)
+        for tile, count in other._max_tiles.items():
+            self._max_tiles[tile] = self._max_tiles.get(tile, 0) + count
+
+    def state(self):
+        """@return the state of this instance as plain tuples and lists,
+        suitable for sending to another process; see from_state()."""
+        return (self._scores.state(), self._score_sketch.state(),
+                self._moves.state(), self._moves_sketch.state(),
+                sorted(self._max_tiles.items()))
+
+    @staticmethod
+    def from_state(state):
+        stats = GameStats()
+        (scores, score_sketch, moves, moves_sketch, max_tiles) = state
+        stats._scores = RunningStats.from_state(scores)
+        stats._score_sketch = QuantileSketch.from_state(score_sketch)
+        stats._moves = RunningStats.from_state(moves)
+        stats._moves_sketch = QuantileSketch.from_state(moves_sketch)
+        stats._max_tiles = dict((tile, count) for tile, count in max_tiles)
+        return stats
+
+    def count(self):
+        return self._scores.count()
+
+    def scores(self):
+        """@return the RunningStats of the scores."""
+        return self._scores
+
+    def moves(self):
+        """@return the RunningStats of the move counts."""
+        return self._moves
+
+    def score_quantile(self, q):
+        return self._score_sketch.quantile(q)
+
+    def moves_quantile(self, q):
+        return self._moves_sketch.quantile(q)
+
+    def max_tile_histogram(self):
+        """@return a sorted list of (tile, number of games whose largest
+        tile it was)."""
+        return sorted(self._max_tiles.items())
+
+    def tile_rate(self, tile):
+        """@return the fraction of games that reached @p tile (the "2048
+        rate" for 2048), or nan if there have been no games."""
+        if not self.count():
+            return float("nan")
+        return (sum(count for max_tile, count in self._max_tiles.items()
+                    if max_tile >= tile) / self.count())
+
+    def summary_lines(self):
+        """@return a human-readable summary, as a list of lines."""
+        scores, moves = self._scores, self._moves
+        stddev = math.sqrt(scores.variance()) if scores.count() > 1 else 0.
+        low, high = scores.confidence_interval()
+        return [
+            "Games: %d" % self.count(),
+            "Score: mean %f (95%% CI %f to %f), stddev %f" %
+            (scores.mean(), low, high, stddev),
+            "Score quantiles: " + ", ".join(
+                "p%g %.0f" % (100 * q, self.score_quantile(q))
+                for q in self.QUANTILES),
+            "Moves: mean %f; " % moves.mean() + ", ".join(
+                "p%g %.0f" % (100 * q, self.moves_quantile(q))
+                for q in self.QUANTILES),
+            "Max tile reached: " + ", ".join(
+                "%d: %d (%.2f%% reached)" %
+                (tile, count, 100 * self.tile_rate(tile))
+                for tile, count in self.max_tile_histogram()),
+        ]
@@ -25,3 +25,11 @@ class Strategy(object):
         """Optionally, subclasses may choose to be notified of the
         outcome of the game.  This is your opportunity to gloat."""
         pass
+
+    def cacheable(self):
+        """@return whether the outcome of a game played by this strategy
+        depends only on the game's tile stream (and on the strategy's own
+        random moves, if any), so that it may be cached by seed.  Strategies
+        that carry state from one game into the next must reset it in
+        notify_outcome() or return False here."""
+        return True
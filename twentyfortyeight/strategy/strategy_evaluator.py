@@ -3,36 +3,141 @@
 """A mechanism for evaluating a strategy and giving it an abstract "score"
 representing how good it is at 2048 without excessive computation."""
 
-from game import Game
+import collections
+import time
+
+from game.common import GAMEOVER, ILLEGAL
+from game.game import Game
+from game.rng import CounterRng
+from strategy.score_stats import GameStats, RunningStats
+
+
+# The result of a sequential evaluation.  `verdict` is only meaningful when
+# a reference score was given:  +1 if the strategy is confidently better
+# than the reference, -1 if confidently worse, and 0 if the evaluation
+# stopped (on precision or on max_runs) without settling the comparison.
+SequentialResult = collections.namedtuple(
+    "SequentialResult",
+    ["mean", "low", "high", "num_runs", "verdict"])
+
+
+def play_game(strategy, game, telemetry=None):
+    """Play @p game to completion with @p strategy.  If @p telemetry is set,
+    record the game's moves and outcome in it.
+
+    @return (score, max_tile, num_moves) for the finished game."""
+    num_moves = 0
+    running = True
+    while running:
+        move_start = time.perf_counter()
+        move = strategy.get_move(game.board(), game.score())
+        latency = time.perf_counter() - move_start
+        turn_outcome = game.do_turn(move)
+        if telemetry:
+            telemetry.record_move(latency, turn_outcome == ILLEGAL)
+        num_moves += (turn_outcome != ILLEGAL)
+        running = (turn_outcome != GAMEOVER)
+    strategy.notify_outcome(game.board(), game.score())
+    if telemetry:
+        telemetry.record_game(game.score())
+    max_tile = max(max(column) for column in game.board().columns())
+    return game.score(), max_tile, num_moves
 
 
 class StrategyEvaluator(object):
     NUM_RUNS = 100
+    BATCH_SIZE = 25
+    MIN_RUNS = 50
+    MAX_RUNS = 10000
 
-    def __init__(self, strategy):
+    def __init__(self, strategy, cache=None, cache_key=None, first_seed=0,
+                 telemetry=None):
+        """If an EvaluationCache @p cache is given, the runs are the games
+        seeded from @p first_seed upward, and those cached under the
+        strategy key @p cache_key are not played again.  Only cacheable
+        strategies (see Strategy.cacheable) may be given a cache.  If
+        @p telemetry is set, every game, cached or played, is recorded in
+        it."""
+        assert cache is None or strategy.cacheable(), \
+            "%s cannot be cached" % strategy.name()
         self._strategy = strategy
+        self._cache = cache
+        self._cache_key = cache_key
+        self._next_seed = first_seed
+        self._telemetry = telemetry
+
+    def one_outcome(self):
+        """@return (score, max_tile, num_moves) of one game."""
+        if self._cache is None:
+            return play_game(self._strategy, Game(), self._telemetry)
+        seed = self._next_seed
+        self._next_seed += 1
+        outcome = self._cache.get(self._cache_key, seed)
+        if outcome is None:
+            outcome = play_game(self._strategy, Game(rnd=CounterRng(seed)),
+                                self._telemetry)
+            self._cache.put(self._cache_key, seed, outcome)
+        elif self._telemetry:
+            self._telemetry.record_game(outcome[0])
+        return outcome
 
     def one_run(self):
-        game = Game()
-        running = True
-        while running:
-            turn_outcome = game.do_turn(
-                self._strategy.get_move(game.board(), game.score()))
-            running = (turn_outcome != Game.GAMEOVER)
-        self._strategy.notify_outcome(game.board(), game.score())
-        return game.score()
+        score, _, _ = self.one_outcome()
+        return score
 
     def evaluate(self):
-        total_score = 0
-        for _ in range(StrategyEvaluator.NUM_RUNS):
-            total_score += self.one_run()
-        return total_score / StrategyEvaluator.NUM_RUNS
+        return self.evaluate_stats().scores().mean()
+
+    def evaluate_stats(self, num_runs=NUM_RUNS):
+        """@return the GameStats of @p num_runs games."""
+        stats = GameStats()
+        for _ in range(num_runs):
+            stats.add(*self.one_outcome())
+        return stats
+
+    def evaluate_sequential(self, precision=None, reference=None, z=1.96,
+                            batch_size=BATCH_SIZE, min_runs=MIN_RUNS,
+                            max_runs=MAX_RUNS):
+        """Play games in batches of @p batch_size until the estimate of the
+        mean score is good enough, and return a SequentialResult.
+
+        The evaluation stops as soon as (after at least @p min_runs games):
+         * the confidence interval half-width (at @p z standard errors) is
+           at most @p precision, if given; or
+         * the confidence interval excludes @p reference, if given, so
+           that the comparison against it is settled; or
+         * @p max_runs games have been played.
+
+        Note that the interval is checked after every batch, so the true
+        error rate of the stopping rule is somewhat above that implied by
+        @p z; prefer a larger @p z or @p batch_size for tight decisions."""
+        assert precision is not None or reference is not None, \
+            "evaluate_sequential needs a precision or a reference score"
+        stats = RunningStats()
+        verdict = 0
+        while stats.count() < max_runs:
+            for _ in range(min(batch_size, max_runs - stats.count())):
+                stats.add(self.one_run())
+            if stats.count() < min_runs:
+                continue
+            low, high = stats.confidence_interval(z)
+            if reference is not None and low > reference:
+                verdict = 1
+                break
+            if reference is not None and high < reference:
+                verdict = -1
+                break
+            if precision is not None and (high - low) / 2 <= precision:
+                break
+        low, high = stats.confidence_interval(z)
+        return SequentialResult(stats.mean(), low, high,
+                                stats.count(), verdict)
 
 
 if __name__ == '__main__':
-    import strategy
-    for strat in [strategy.RandomStrategy(),
-                  strategy.SpinnyStrategy()]:
+    from strategy.basic import RandomStrategy, SpinnyStrategy
+    for strat in [RandomStrategy(),
+                  SpinnyStrategy()]:
         evaluator = StrategyEvaluator(strat)
         score = evaluator.evaluate()
         print(strat.name(), score)
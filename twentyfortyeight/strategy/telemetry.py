@@ -0,0 +1,297 @@
+"""Live throughput telemetry for long-running generation and evaluation jobs.
+
+A Telemetry instance in each process counts games, moves, illegal moves and
+examples, and keeps histograms of strategy latency and of game scores, all
+of which merge across processes by simple addition.  Each process's
+snapshot() can be published to a TelemetryAggregator in the main process,
+whose merged snapshot is reported periodically as JSON lines
+(JsonLinesReporter) or served in the Prometheus text format
+(PrometheusExporter)."""
+
+import http.server
+import json
+import math
+import os
+import resource
+import sys
+import threading
+import time
+
+from strategy.score_stats import RunningStats
+
+# Latency histogram buckets are quarter-octaves of microseconds.
+LATENCY_BUCKETS_PER_OCTAVE = 4
+NUM_LATENCY_BUCKETS = 32 * LATENCY_BUCKETS_PER_OCTAVE
+# Score histogram bucket i holds scores with bit length i.
+NUM_SCORE_BUCKETS = 24
+LATENCY_PERCENTILES = (50, 90, 99)
+_COUNTERS = ("games", "moves", "illegal_moves", "examples")
+
+
+def current_rss_bytes():
+    """@return the resident set size of this process, or its peak resident
+    set size where the current one is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _latency_bucket(seconds):
+    microseconds = max(seconds * 1e6, 1.)
+    return min(int(LATENCY_BUCKETS_PER_OCTAVE * math.log2(microseconds)),
+               NUM_LATENCY_BUCKETS - 1)
+
+
+def _bucket_percentile(buckets, percentile):
+    """@return the upper bound in seconds of the latency bucket holding the
+    @p percentile'th percentile of @p buckets, or 0 if they are empty."""
+    threshold = sum(buckets) * percentile / 100.
+    seen = 0
+    for i, count in enumerate(buckets):
+        seen += count
+        if count and seen >= threshold:
+            return 2 ** ((i + 1) / LATENCY_BUCKETS_PER_OCTAVE) / 1e6
+    return 0.
+
+
+class Telemetry(object):
+    """The telemetry of one process."""
+
+    def __init__(self, publish_queue=None, publish_period=10.):
+        """If @p publish_queue is given, a snapshot is put on it at most
+        every @p publish_period seconds as events are recorded, and on
+        publish()."""
+        self._start_time = time.time()
+        self._counters = {name: 0 for name in _COUNTERS}
+        self._latency_buckets = [0] * NUM_LATENCY_BUCKETS
+        self._scores = RunningStats()
+        self._score_buckets = [0] * NUM_SCORE_BUCKETS
+        self._publish_queue = publish_queue
+        self._publish_period = publish_period
+        self._last_publish = self._start_time
+
+    def record_move(self, latency, illegal=False):
+        """Records a move for which the strategy took @p latency seconds."""
+        self._counters["moves"] += 1
+        self._counters["illegal_moves"] += bool(illegal)
+        self._latency_buckets[_latency_bucket(latency)] += 1
+
+    def record_game(self, score):
+        self._counters["games"] += 1
+        self._scores.add(score)
+        self._score_buckets[min(int(score).bit_length(),
+                                NUM_SCORE_BUCKETS - 1)] += 1
+        self._maybe_publish()
+
+    def record_examples(self, num_examples):
+        self._counters["examples"] += num_examples
+        self._maybe_publish()
+
+    def _maybe_publish(self):
+        if (self._publish_queue is not None and
+                time.time() - self._last_publish >= self._publish_period):
+            self.publish()
+
+    def publish(self):
+        self._last_publish = time.time()
+        self._publish_queue.put(self.snapshot())
+
+    def snapshot(self):
+        """@return the cumulative telemetry of this process as a plain dict,
+        which merge_snapshots can combine with those of other processes."""
+        return {"pids": [os.getpid()],
+                "start_time": self._start_time,
+                "time": time.time(),
+                "rss_bytes": current_rss_bytes(),
+                "latency_buckets": list(self._latency_buckets),
+                "scores": self._scores.state(),
+                "score_buckets": list(self._score_buckets),
+                **self._counters}
+
+
+def merge_snapshots(snapshots):
+    """@return the snapshot of a set of processes from their @p snapshots."""
+    snapshots = list(snapshots)
+    scores = RunningStats()
+    for snapshot in snapshots:
+        scores.merge(RunningStats.from_state(snapshot["scores"]))
+    merged = {
+        "pids": [pid for snapshot in snapshots for pid in snapshot["pids"]],
+        "start_time": min(snapshot["start_time"] for snapshot in snapshots),
+        "time": max(snapshot["time"] for snapshot in snapshots),
+        "scores": scores.state()}
+    for name in ("rss_bytes",) + _COUNTERS:
+        merged[name] = sum(snapshot[name] for snapshot in snapshots)
+    for name in ("latency_buckets", "score_buckets"):
+        merged[name] = [sum(counts) for counts in
+                        zip(*(snapshot[name] for snapshot in snapshots))]
+    return merged
+
+
+def summarize(snapshot, previous=None):
+    """@return a flat dict of metrics from @p snapshot.  Rates are over the
+    interval since the snapshot @p previous, if given, and otherwise since
+    the start of the job."""
+    previous = previous or {name: 0 for name in _COUNTERS}
+    elapsed = max(snapshot["time"] -
+                  previous.get("time", snapshot["start_time"]), 1e-9)
+    scores = RunningStats.from_state(snapshot["scores"])
+    metrics = {"time": snapshot["time"],
+               "processes": len(snapshot["pids"]),
+               "rss_bytes": snapshot["rss_bytes"],
+               "games": snapshot["games"],
+               "moves": snapshot["moves"],
+               "examples": snapshot["examples"],
+               "illegal_move_fraction": (snapshot["illegal_moves"] /
+                                         max(snapshot["moves"], 1)),
+               "score_mean": scores.mean(),
+               "score_stddev": (math.sqrt(scores.variance())
+                                if scores.count() > 1 else 0.),
+               "score_histogram": {2 ** i: count for i, count in
+                                   enumerate(snapshot["score_buckets"])
+                                   if count}}
+    for name in ("games", "moves", "examples"):
+        metrics[name + "_per_sec"] = (
+            (snapshot[name] - previous[name]) / elapsed)
+    for percentile in LATENCY_PERCENTILES:
+        metrics["latency_p%d_seconds" % percentile] = _bucket_percentile(
+            snapshot["latency_buckets"], percentile)
+    return metrics
+
+
+class TelemetryAggregator(object):
+    """Collects the snapshots published by worker processes onto queue(),
+    and merges the latest snapshot of each with the local Telemetry.  The
+    queue is drained continuously by a background thread, so that workers
+    never block on it."""
+
+    def __init__(self, context, local=None):
+        """@p context is the multiprocessing context of the workers."""
+        self._queue = context.Queue()
+        self._local = local or Telemetry()
+        self._latest = {}  # pid -> snapshot
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        while True:
+            snapshot = self._queue.get()
+            with self._lock:
+                self._latest[snapshot["pids"][0]] = snapshot
+
+    def queue(self):
+        return self._queue
+
+    def local(self):
+        return self._local
+
+    def snapshot(self):
+        with self._lock:
+            latest = list(self._latest.values())
+        return merge_snapshots([self._local.snapshot()] + latest)
+
+
+class JsonLinesReporter(object):
+    """Appends the summarized snapshot of @p source (anything with a
+    snapshot() method) as a JSON line to the file @p filename ("-" for
+    stdout) every @p period seconds, from a background thread."""
+
+    def __init__(self, source, filename, period=60.):
+        self._source = source
+        self._stream = (sys.stdout if filename == "-"
+                        else open(filename, "a"))
+        self._period = period
+        self._previous = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def report(self):
+        snapshot = self._source.snapshot()
+        self._stream.write(json.dumps(summarize(snapshot, self._previous)) +
+                           "\n")
+        self._stream.flush()
+        self._previous = snapshot
+
+    def _run(self):
+        while not self._stop.wait(self._period):
+            self.report()
+
+    def stop(self):
+        """Stops the reporting thread, writing a final report."""
+        self._stop.set()
+        self._thread.join()
+        self.report()
+        if self._stream is not sys.stdout:
+            self._stream.close()
+
+
+def prometheus_text(metrics):
+    """@return the @p metrics of summarize() in the Prometheus text
+    exposition format."""
+    lines = []
+    for name, value in sorted(metrics.items()):
+        if name == "score_histogram":
+            for bucket, count in sorted(value.items()):
+                lines.append('twentyfortyeight_score_bucket{below="%d"} %d' %
+                             (bucket, count))
+        else:
+            lines.append("twentyfortyeight_%s %s" % (name, value))
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusExporter(object):
+    """Serves the summarized snapshot of @p source at
+    http://localhost:@p port/metrics from a background thread."""
+
+    def __init__(self, source, port):
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = prometheus_text(summarize(source.snapshot())).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer(
+            ("localhost", port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def add_telemetry_arguments(parser):
+    """Adds the command line flags read by start_telemetry_reporting to the
+    argparse @p parser."""
+    parser.add_argument('--telemetry_jsonl', metavar='FILENAME', type=str,
+                        help=("append periodic throughput telemetry as JSON "
+                              "lines to this file ('-' for stdout)"))
+    parser.add_argument('--telemetry_period', metavar='SECONDS', type=float,
+                        default=60., help="seconds between telemetry lines")
+    parser.add_argument('--metrics_port', metavar='PORT', type=int,
+                        help=("serve Prometheus-style telemetry at "
+                              "http://localhost:PORT/metrics"))
+
+
+def start_telemetry_reporting(args, source):
+    """Starts the reporters requested by the flags of
+    add_telemetry_arguments in @p args, reporting on @p source.  @return a
+    list of the reporters, each of which must be stop()ped."""
+    reporters = []
+    if args.telemetry_jsonl:
+        reporters.append(JsonLinesReporter(source, args.telemetry_jsonl,
+                                           args.telemetry_period))
+    if args.metrics_port:
+        reporters.append(PrometheusExporter(source, args.metrics_port))
+    return reporters
@@ -0,0 +1,87 @@
+import contextlib
+import io
+import os
+import random
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from game.rng import CounterRng
+from game.game import Game
+from strategy.basic import SpinnyStrategy
+from strategy.nn.data import Dataset, EXAMPLE_DTYPE, SCORE_DTYPE
+
+
+class _StoppingSpinnyStrategy(SpinnyStrategy):
+    """Sets @p stop_event at the end of its first game."""
+
+    def __init__(self, stop_event):
+        super().__init__()
+        self._stop_event = stop_event
+
+    def notify_outcome(self, board, score):
+        super().notify_outcome(board, score)
+        self._stop_event.set()
+
+
+class TestDataset(unittest.TestCase):
+    def setUp(self):
+        self.dataset = Dataset()
+        for i in range(3):
+            self.dataset.add_game(SpinnyStrategy(), None,
+                                  Game(rnd=CounterRng(1, i)))
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_compact_dtypes(self):
+        for batch in self.dataset.example_batches():
+            self.assertEqual(batch.dtype, EXAMPLE_DTYPE)
+        for batch in self.dataset.score_batches():
+            self.assertEqual(batch.dtype, SCORE_DTYPE)
+
+    def test_save_and_load(self):
+        filename = os.path.join(self.directory.name, "data.npz")
+        self.dataset.save(filename)
+        with open(filename, "rb") as f:
+            self.assertIn("packed_0", np.load(f).files)
+        loaded = Dataset.load(filename)
+        self.assertEqual(loaded.example_batches()[0].shape,
+                         self.dataset.example_batches()[0].shape)
+        self.assertTrue((loaded.example_batches()[0] ==
+                         self.dataset.example_batches()[0]).all())
+        self.assertTrue((loaded.score_batches()[0] ==
+                         self.dataset.score_batches()[0]).all())
+
+    def test_load_old_layout(self):
+        filename = os.path.join(self.directory.name, "old.npz")
+        examples = self.dataset.example_batches()[0].astype(np.float64)
+        scores = self.dataset.score_batches()[0].astype(np.float64)
+        with open(filename, "wb") as f:
+            np.savez(f, examples_0=examples, scores_0=scores)
+        loaded = Dataset.load(filename)
+        self.assertEqual(loaded.example_batches()[0].dtype, EXAMPLE_DTYPE)
+        self.assertTrue((loaded.example_batches()[0] == examples).all())
+        self.assertTrue((loaded.score_batches()[0] == scores).all())
+
+    def test_add_n_examples_stops_after_current_game(self):
+        stop_event = threading.Event()
+        dataset = Dataset()
+        with contextlib.redirect_stdout(io.StringIO()):
+            added = dataset.add_n_examples(
+                _StoppingSpinnyStrategy(stop_event), random.Random(1),
+                1000000, stop_event=stop_event)
+        # Only the one game is played.
+        self.assertGreater(added, 0)
+        self.assertLess(added, 10000)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(Dataset().add_n_examples(
+                SpinnyStrategy(), random.Random(1), 1000000,
+                stop_event=stop_event), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+DEMO = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                    os.pardir, os.pardir, os.pardir, "demo.py")
+
+
+class TestDemo(unittest.TestCase):
+    """Smoke tests of the demo entry point, run as a user would run it
+    (and from another directory, so that imports cannot rely on it)."""
+
+    def run_demo(self, *args):
+        with tempfile.TemporaryDirectory() as directory:
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(DEMO)] + list(args),
+                cwd=directory, capture_output=True, text=True, timeout=300)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout
+
+    def test_plain(self):
+        self.assertIn("... 0 / 1", self.run_demo("--strategy", "random"))
+
+    def test_greedy(self):
+        self.assertIn("... 0 / 1", self.run_demo("--strategy", "greedy"))
+
+    def test_summary_with_telemetry(self):
+        output = self.run_demo("--strategy", "spinny", "--number_of_games",
+                               "3", "--summary", "--telemetry_jsonl", "-")
+        self.assertIn("Strategy spinny had average score", output)
+        self.assertIn('"games": 3', output)
+
+    def test_sequential_evaluation(self):
+        output = self.run_demo("--strategy", "random", "--compare_to", "1",
+                               "--number_of_games", "1")
+        self.assertIn("Better than 1.0", output)
+
+    def test_sequential_evaluation_with_telemetry(self):
+        output = self.run_demo("--strategy", "spinny", "--compare_to", "1",
+                               "--telemetry_jsonl", "-")
+        self.assertIn("Better than 1.0", output)
+        self.assertIn('"games": 50', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+from strategy.basic import SpinnyStrategy
+from strategy.eval_cache import EvaluationCache, strategy_key
+from strategy.opening_book import OpeningBookStrategy
+from strategy.strategy_evaluator import StrategyEvaluator
+
+
+class _GameCountingSpinnyStrategy(SpinnyStrategy):
+    def __init__(self):
+        super().__init__()
+        self.games = 0
+
+    def notify_outcome(self, board, score):
+        super().notify_outcome(board, score)
+        self.games += 1
+
+
+class TestEvaluationCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_store_and_lookup(self):
+        cache = EvaluationCache(self.filename)
+        cache.store("name:a", {1: (100, 8, 50), 2: (200, 16, 90)})
+        cache.put("name:b", 1, (300, 32, 120))
+        self.assertEqual(cache.lookup("name:a", range(5)),
+                         {1: (100, 8, 50), 2: (200, 16, 90)})
+        self.assertEqual(cache.get("name:b", 1), (300, 32, 120))
+        self.assertIsNone(cache.get("name:b", 2))
+        cache.close()
+
+    def test_concurrent_writers_keep_first_outcome(self):
+        first, second = (EvaluationCache(self.filename),
+                         EvaluationCache(self.filename))
+        first.put("name:a", 1, (100, 8, 50))
+        second.store("name:a", {1: (999, 8, 50), 2: (200, 16, 90)})
+        self.assertEqual(first.lookup("name:a", [1, 2]),
+                         {1: (100, 8, 50), 2: (200, 16, 90)})
+        first.close()
+        second.close()
+
+    def test_model_files_are_keyed_by_contents(self):
+        model_filename = os.path.join(self.directory.name, "model.hdf5")
+        with open(model_filename, "wb") as f:
+            f.write(b"weights")
+        key = strategy_key(model_filename)
+        os.rename(model_filename, model_filename + ".renamed")
+        self.assertEqual(strategy_key(model_filename + ".renamed"), key)
+        self.assertEqual(strategy_key("spinny"), "name:spinny")
+
+    def test_evaluator_replays_only_missing_seeds(self):
+        cache = EvaluationCache(self.filename)
+        strategy = _GameCountingSpinnyStrategy()
+        first_score = StrategyEvaluator(strategy, cache, "name:spinny",
+                                        first_seed=10).one_run()
+        evaluator = StrategyEvaluator(strategy, cache, "name:spinny",
+                                      first_seed=10)
+        rerun = [evaluator.one_run() for _ in range(3)]
+        self.assertEqual(strategy.games, 3)
+        self.assertEqual(rerun[0], first_score)
+        self.assertEqual(len(cache.lookup("name:spinny", range(10, 13))), 3)
+        cache.close()
+
+    def test_spinny_games_depend_only_on_seed(self):
+        # A strategy reused for several games must play the third seed as a
+        # fresh one would, or the outcome cached for it would be wrong.
+        cache = EvaluationCache(self.filename)
+        evaluator = StrategyEvaluator(SpinnyStrategy(), cache, "name:a",
+                                      first_seed=20)
+        scores = [evaluator.one_run() for _ in range(3)]
+        fresh = StrategyEvaluator(SpinnyStrategy(), cache, "name:b",
+                                  first_seed=22)
+        self.assertEqual(fresh.one_run(), scores[2])
+        cache.close()
+
+    def test_evaluator_refuses_to_cache_opening_book(self):
+        cache = EvaluationCache(self.filename)
+        with self.assertRaises(AssertionError):
+            StrategyEvaluator(OpeningBookStrategy(SpinnyStrategy()), cache,
+                              "name:spinny")
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
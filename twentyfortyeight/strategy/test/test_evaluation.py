@@ -0,0 +1,61 @@
+import unittest
+
+import numpy as np
+
+from game.board import Board
+from game.common import *
+from strategy.evaluation import (BoardEvaluator, board_lines,
+                                 line_heuristics)
+from strategy.greedy import GreedyStrategy
+
+
+class TestEvaluation(unittest.TestCase):
+    def setUp(self):
+        self.board = Board([[2, 128, 8, 8], [8, 8, 16, 0],
+                            [4, 32, 4, 0], [2, 4, 0, 0]])
+        self.evaluator = BoardEvaluator()
+
+    def _line(self, exponents):
+        return sum(e << (4 * i) for i, e in enumerate(exponents))
+
+    def test_line_heuristics(self):
+        heuristics = line_heuristics()
+        line = self._line([1, 1, 0, 3])
+        self.assertEqual(heuristics["empty"][line], 1)
+        self.assertEqual(heuristics["merges"][line], 1)
+        self.assertEqual(heuristics["smoothness"][line], 2)
+        self.assertEqual(heuristics["monotonicity"][line], 1)
+        self.assertEqual(heuristics["corner"][line], 3 + 1 + 9)
+        self.assertEqual(heuristics["merges"][self._line([2, 0, 0, 2])], 1)
+        self.assertEqual(heuristics["smoothness"][self._line([2, 5, 0, 0])],
+                         3)
+
+    def test_board_lines(self):
+        lines = board_lines([self.board.as_packed()])[0]
+        self.assertEqual(lines[0], self._line([1, 7, 3, 3]))
+        self.assertEqual(lines[WIDTH - 1], self._line([1, 2, 0, 0]))
+        self.assertEqual(lines[WIDTH], self._line([1, 3, 2, 1]))
+        self.assertEqual(lines[-1], self._line([3, 0, 0, 0]))
+
+    def test_scalar_matches_vectorized(self):
+        boards = [self.board, Board(), self.board.rotate_cw()]
+        scores = self.evaluator.evaluate_packed(
+            np.array([b.as_packed() for b in boards], dtype=np.uint64))
+        for board, score in zip(boards, scores):
+            self.assertAlmostEqual(self.evaluator.evaluate(board), score)
+
+    def test_symmetric(self):
+        score = self.evaluator.evaluate(self.board)
+        self.assertAlmostEqual(self.evaluator.evaluate(
+            self.board.rotate_cw()), score)
+        self.assertAlmostEqual(self.evaluator.evaluate(
+            self.board.rotate_ccw().rotate_ccw()), score)
+
+    def test_greedy_moves_legally(self):
+        board = Board().update((0, 0), 8)
+        self.assertIn(GreedyStrategy(self.evaluator).get_move(board, 0),
+                      {DOWN, RIGHT})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import random
+import tempfile
+import unittest
+
+from game.board import Board
+from game.common import *
+from game.game import Game
+from strategy.opening_book import (SYMMETRIES, OpeningBookStrategy,
+                                   _permute_packed, canonicalize)
+from strategy.strategy import Strategy
+
+
+class _CountingStrategy(Strategy):
+    """Always moves down (or left, if down is illegal), counting calls."""
+    def __init__(self):
+        self.calls = 0
+
+    def get_move(self, board, score):
+        self.calls += 1
+        return DOWN if Game(board=board).smash(DOWN) else LEFT
+
+
+class TestOpeningBook(unittest.TestCase):
+    def setUp(self):
+        self.board = Board([[2, 128, 8, 8], [8, 8, 16, 0],
+                            [4, 32, 4, 0], [2, 4, 0, 0]])
+
+    def test_symmetries_preserve_moves(self):
+        packed = self.board.as_packed()
+        for permutation, direction_map in SYMMETRIES:
+            transformed = Board.from_packed(
+                _permute_packed(packed, permutation))
+            for direction in DIRECTIONS:
+                game = Game(board=self.board)
+                transformed_game = Game(board=transformed)
+                legal = game.smash(direction)
+                self.assertEqual(legal, transformed_game.smash(
+                    direction_map[direction]))
+                if not legal:
+                    continue
+                self.assertEqual(
+                    _permute_packed(game.board().as_packed(), permutation),
+                    transformed_game.board().as_packed())
+
+    def test_canonical_key_is_shared(self):
+        key, _ = canonicalize(self.board)
+        self.assertEqual(canonicalize(self.board.rotate_cw())[0], key)
+        self.assertEqual(canonicalize(self.board.rotate_ccw())[0], key)
+
+    def test_book_answers_symmetric_positions(self):
+        inner = _CountingStrategy()
+        strategy = OpeningBookStrategy(inner, max_tile_sum=1000)
+        board = Board().update((1, 1), 2).update((3, 0), 4)
+        self.assertEqual(strategy.get_move(board, 0), DOWN)
+        # The rotated board is in the book; the equivalent move is LEFT.
+        self.assertEqual(strategy.get_move(board.rotate_cw(), 0), LEFT)
+        self.assertEqual(inner.calls, 1)
+        self.assertEqual(strategy.stats(),
+                         {"size": 1, "hits": 1, "misses": 1,
+                          "beyond_book": 0})
+
+    def test_save_and_load(self):
+        strategy = OpeningBookStrategy(_CountingStrategy(), max_tile_sum=1000)
+        game = Game(rnd=random.Random(1))
+        for _ in range(10):
+            game.do_turn(strategy.get_move(game.board(), game.score()))
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "book.npz")
+            strategy.save(filename)
+            loaded = OpeningBookStrategy(_CountingStrategy(), filename)
+            with self.assertRaises(ValueError):
+                OpeningBookStrategy(_CountingStrategy(), filename,
+                                    max_tile_sum=128)
+        self.assertEqual(loaded.stats()["size"], strategy.stats()["size"])
+        self.assertEqual(loaded._book, strategy._book)
+        # The book is consulted at the depth it was built at.
+        self.assertEqual(loaded._max_tile_sum, 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+
+from strategy.nn.replay import PrioritizedReplay, SumTree
+
+
+class TestSumTree(unittest.TestCase):
+    def test_update_and_find(self):
+        tree = SumTree(5)
+        tree.update(np.arange(5), [1., 0., 2., 3., 4.])
+        self.assertEqual(tree.total(), 10.)
+        self.assertEqual(list(tree.find([0., 0.99, 1., 2.5, 3., 5.9, 6.,
+                                          9.99, 10.])),
+                         [0, 0, 2, 2, 3, 3, 4, 4, 4])
+        tree.update([2, 2], [5., 1.])
+        self.assertEqual(tree.total(), 9.)
+        self.assertEqual(list(tree.get([0, 2])), [1., 1.])
+
+    def test_find_never_returns_padding_leaf(self):
+        # Rounding in the sums of wide-ranging priorities used to carry the
+        # largest values onto the zero-priority leaves past the capacity.
+        rng = np.random.default_rng(0)
+        for _ in range(3000):
+            capacity = int(rng.integers(2, 40))
+            tree = SumTree(capacity)
+            tree.update(np.arange(capacity),
+                        rng.uniform(0, 1, capacity) ** 8 *
+                        10 ** rng.uniform(-5, 5, capacity))
+            indices = tree.find(np.full(4, np.nextafter(tree.total(), 0)))
+            self.assertTrue((indices < capacity).all())
+            self.assertTrue((tree.get(indices) > 0).all())
+
+
+class TestPrioritizedReplay(unittest.TestCase):
+    def test_sampling_follows_priorities(self):
+        replay = PrioritizedReplay(4, alpha=1., epsilon=0.)
+        replay.add(np.arange(8).reshape(4, 2), np.arange(4))
+        self.assertEqual(len(replay), 4)
+        replay.update_priorities(np.arange(4), [0., 0., 0., 1.])
+        indices, x, y, weights = replay.sample(16)
+        self.assertTrue(all(indices == 3))
+        self.assertTrue(all(y == 3))
+        self.assertEqual(list(x[0]), [6, 7])
+        self.assertTrue(all(weights == 1.))
+
+    def test_overwrites_oldest(self):
+        replay = PrioritizedReplay(3)
+        replay.add(np.zeros((2, 1)), [1, 2])
+        replay.add(np.zeros((2, 1)), [3, 4])
+        self.assertEqual(len(replay), 3)
+        _, _, y, _ = replay.sample(30)
+        self.assertEqual(set(y), {2, 3, 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import random
+import unittest
+
+from strategy.score_stats import GameStats, QuantileSketch, RunningStats
+
+
+class TestRunningStats(unittest.TestCase):
+    def setUp(self):
+        rnd = random.Random(1)
+        self.values = [rnd.randint(0, 5000) for _ in range(101)]
+
+    def test_mean_and_variance(self):
+        stats = RunningStats()
+        for value in self.values:
+            stats.add(value)
+        n = len(self.values)
+        mean = sum(self.values) / n
+        variance = sum((v - mean) ** 2 for v in self.values) / (n - 1)
+        self.assertEqual(stats.count(), n)
+        self.assertAlmostEqual(stats.mean(), mean)
+        self.assertAlmostEqual(stats.variance(), variance)
+        low, high = stats.confidence_interval()
+        self.assertLess(low, mean)
+        self.assertGreater(high, mean)
+
+    def test_merge(self):
+        whole, first, second = RunningStats(), RunningStats(), RunningStats()
+        for i, value in enumerate(self.values):
+            whole.add(value)
+            (first if i < 30 else second).add(value)
+        first.merge(second)
+        self.assertEqual(first.count(), whole.count())
+        self.assertAlmostEqual(first.mean(), whole.mean())
+        self.assertAlmostEqual(first.variance(), whole.variance())
+
+    def test_empty(self):
+        stats = RunningStats()
+        self.assertEqual(stats.variance(), float("inf"))
+        stats.merge(RunningStats())
+        self.assertEqual(stats.count(), 0)
+
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_quantiles_within_relative_accuracy(self):
+        rnd = random.Random(2)
+        values = sorted(rnd.expovariate(1e-4) for _ in range(10001))
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+        for q in (0.01, 0.5, 0.9, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(sketch.quantile(q) / exact, 1., delta=0.01)
+
+    def test_merge_is_exact(self):
+        whole, first, second = (QuantileSketch(), QuantileSketch(),
+                                QuantileSketch())
+        for value in range(0, 5000, 7):
+            whole.add(value)
+            (first if value % 3 else second).add(value)
+        first.merge(QuantileSketch.from_state(second.state()))
+        self.assertEqual(first.state(), whole.state())
+        self.assertEqual(first.quantile(0.9), whole.quantile(0.9))
+
+
+class TestGameStats(unittest.TestCase):
+    def test_outcomes(self):
+        stats, other = GameStats(), GameStats()
+        stats.add(1000, 128, 100)
+        stats.add(3000, 256, 200)
+        other.add(20000, 2048, 900)
+        stats.merge(GameStats.from_state(other.state()))
+        self.assertEqual(stats.count(), 3)
+        self.assertAlmostEqual(stats.scores().mean(), 8000.)
+        self.assertAlmostEqual(stats.moves().mean(), 400.)
+        self.assertEqual(stats.max_tile_histogram(),
+                         [(128, 1), (256, 1), (2048, 1)])
+        self.assertAlmostEqual(stats.tile_rate(256), 2 / 3)
+        self.assertAlmostEqual(stats.tile_rate(2048), 1 / 3)
+        self.assertAlmostEqual(stats.score_quantile(0.5), 3000., delta=30.)
+        self.assertEqual(len(stats.summary_lines()), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
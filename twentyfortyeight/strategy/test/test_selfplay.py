@@ -0,0 +1,158 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from game.game import Game
+from game.rng import CounterRng
+from strategy.basic import SpinnyStrategy
+from strategy.nn.data import Dataset
+from strategy.nn.selfplay import (BEST_MODEL, SHARD_DIR, SelfPlayTrainer,
+                                  _evaluate_checkpoint)
+from strategy.strategy_evaluator import SequentialResult
+
+
+class _FakeAsyncResult(object):
+    def __init__(self, result, ready=True):
+        self._result = result
+        self._ready = ready
+
+    def ready(self):
+        return self._ready
+
+    def wait(self):
+        self._ready = True
+
+    def get(self):
+        return self._result
+
+
+class _FakePool(object):
+    """Answers every evaluation with @p result, recording the calls."""
+
+    def __init__(self, result):
+        self._result = result
+        self.calls = []
+
+    def apply_async(self, function, args):
+        self.calls.append((function, args))
+        return _FakeAsyncResult(self._result, ready=False)
+
+
+def _result(mean, verdict):
+    return SequentialResult(mean, mean - 10, mean + 10, 100, verdict)
+
+
+class TestSelfPlayTrainer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.work_dir = self.directory.name
+        self.best = os.path.join(self.work_dir, BEST_MODEL)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_trainer(self, **kwargs):
+        # A stand-in model; these tests never train it.
+        return SelfPlayTrainer(self.work_dir, 2, 1, 1, model=object(),
+                               **kwargs)
+
+    def write_file(self, filename, contents):
+        with open(filename, "w") as f:
+            f.write(contents)
+
+    def read_file(self, filename):
+        with open(filename) as f:
+            return f.read()
+
+    def write_shard(self, name):
+        dataset = Dataset()
+        dataset.add_game(SpinnyStrategy(), None, Game(rnd=CounterRng(3)))
+        filename = os.path.join(self.work_dir, SHARD_DIR, name)
+        dataset.save(filename)
+        return filename
+
+    def finish(self, trainer, snapshot, result):
+        trainer._pending_eval = (snapshot, _FakeAsyncResult(result))
+        with contextlib.redirect_stdout(io.StringIO()):
+            trainer._finish_evaluation()
+
+    def test_take_new_shards_keeps_window(self):
+        trainer = self.make_trainer()
+        shards = [self.write_shard("shard_w00_%06d.npz" % i)
+                  for i in range(3)]
+        partial = self.write_shard("shard_w01_000000.tmp.npz")
+        self.assertEqual(trainer._take_new_shards(), 3)
+        self.assertEqual([filename for filename, _ in trainer._replay],
+                         shards[1:])
+        self.assertFalse(os.path.exists(shards[0]))
+        self.assertTrue(os.path.exists(partial))
+        self.assertEqual(trainer._take_new_shards(), 0)
+        newest = self.write_shard("shard_w00_000003.npz")
+        self.assertEqual(trainer._take_new_shards(), 1)
+        self.assertEqual([filename for filename, _ in trainer._replay],
+                         [shards[2], newest])
+
+    def test_unfinished_evaluation_stays_pending(self):
+        trainer = self.make_trainer()
+        pending = ("snapshot", _FakeAsyncResult(_result(100, 1), False))
+        trainer._pending_eval = pending
+        trainer._finish_evaluation()
+        self.assertIs(trainer._pending_eval, pending)
+
+    def test_first_snapshot_promoted_without_best(self):
+        trainer = self.make_trainer()
+        snapshot = os.path.join(self.work_dir, "candidate_000001.hdf5")
+        self.write_file(snapshot, "first")
+        self.finish(trainer, snapshot, _result(100, 0))
+        self.assertIsNone(trainer._pending_eval)
+        self.assertEqual(self.read_file(self.best), "first")
+        self.assertEqual(trainer._best_score, 100)
+
+    def test_better_snapshot_promoted(self):
+        trainer = self.make_trainer()
+        trainer._best_score = 100
+        self.write_file(self.best, "old")
+        snapshot = os.path.join(self.work_dir, "candidate_000002.hdf5")
+        self.write_file(snapshot, "better")
+        self.finish(trainer, snapshot, _result(150, 1))
+        self.assertEqual(self.read_file(self.best), "better")
+        self.assertFalse(os.path.exists(snapshot))
+        self.assertEqual(trainer._best_score, 150)
+
+    def test_inconclusive_snapshot_discarded(self):
+        trainer = self.make_trainer()
+        trainer._best_score = 100
+        self.write_file(self.best, "old")
+        snapshot = os.path.join(self.work_dir, "candidate_000002.hdf5")
+        self.write_file(snapshot, "no better")
+        self.finish(trainer, snapshot, _result(105, 0))
+        self.assertEqual(self.read_file(self.best), "old")
+        self.assertFalse(os.path.exists(snapshot))
+        self.assertEqual(trainer._best_score, 100)
+
+    def test_existing_best_scored_before_any_snapshot(self):
+        transfer = os.path.join(self.work_dir, "transfer.hdf5")
+        self.write_file(transfer, "transferred")
+        trainer = self.make_trainer(transfer_from=transfer,
+                                    eval_max_games=40)
+        self.assertEqual(self.read_file(self.best), "transferred")
+        pool = _FakePool(_result(120, 0))
+        with contextlib.redirect_stdout(io.StringIO()):
+            trainer.run(0, pool)
+        self.assertEqual(pool.calls,
+                         [(_evaluate_checkpoint, (self.best, None, 40))])
+        self.assertEqual(trainer._best_score, 120)
+        self.assertEqual(self.read_file(self.best), "transferred")
+
+    def test_transfer_does_not_replace_best(self):
+        self.write_file(self.best, "old")
+        transfer = os.path.join(self.work_dir, "transfer.hdf5")
+        self.write_file(transfer, "transferred")
+        self.make_trainer(transfer_from=transfer)
+        self.assertEqual(self.read_file(self.best), "old")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from strategy.nn.shared_arrays import SharedArrays
+
+
+class TestSharedArrays(unittest.TestCase):
+    def test_pickled_arrays_are_shared(self):
+        x = np.arange(32, dtype=np.uint8).reshape(2, 16)
+        y = np.array([7, 9], dtype=np.uint32)
+        data = SharedArrays({"x": x, "y": y})
+        attached = pickle.loads(pickle.dumps(data))
+        self.assertTrue(np.array_equal(attached["x"], x))
+        self.assertTrue(np.array_equal(attached["y"], y))
+        data["y"][1] = 3
+        self.assertEqual(attached["y"][1], 3)
+        attached.close()
+        data.close()
+
+    def test_arrays_are_aligned(self):
+        data = SharedArrays({"odd": np.zeros(3, dtype=np.uint8),
+                             "wide": np.zeros(2, dtype=np.float64)})
+        self.assertTrue(data["wide"].flags.aligned)
+        self.assertEqual(data["wide"].ctypes.data % 8, 0)
+        data.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import multiprocessing
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from game.board import Board, unpack_exponents
+from game.common import *
+from strategy.nn.shared_inference import (BoardExchange, SharedModelStrategy,
+                                          NUM_DIRECTIONS)
+
+TIMEOUT_SECONDS = 10.
+
+
+def _write_board(exchange):
+    exchange.boards[1, 2] = 17
+    exchange.close()
+
+
+class TestBoardExchange(unittest.TestCase):
+    def setUp(self):
+        self.context = multiprocessing.get_context("spawn")
+        self.exchange = BoardExchange(2, self.context)
+
+    def tearDown(self):
+        self.exchange.close()
+
+    def _serve_one_batch(self):
+        """Scores each board by the negated number of tiles on it, giving
+        up if no request arrives within TIMEOUT_SECONDS."""
+        slots = self.exchange.wait_for_requests(TIMEOUT_SECONDS)
+        if not len(slots):
+            return
+        tiles = unpack_exponents(self.exchange.boards[slots].flatten())
+        self.exchange.respond(
+            slots, -(tiles > 0).sum(axis=1).reshape(len(slots),
+                                                    NUM_DIRECTIONS))
+
+    def _request_with_server(self, request):
+        """@return the result of calling @p request while serving one batch,
+        failing the test rather than hanging if either side is stuck."""
+        result = []
+        server = threading.Thread(target=self._serve_one_batch, daemon=True)
+        client = threading.Thread(target=lambda: result.append(request()),
+                                  daemon=True)
+        server.start()
+        client.start()
+        client.join(TIMEOUT_SECONDS)
+        server.join(TIMEOUT_SECONDS)
+        self.assertFalse(client.is_alive(), "request got no response")
+        self.assertFalse(server.is_alive(), "server did not finish")
+        return result[0]
+
+    def test_round_trip(self):
+        scores = self._request_with_server(lambda: self.exchange.evaluate(
+            1, np.array([0, 0x1, 0x11, 0x111], dtype=np.uint64),
+            [True, True, False, True]))
+        self.assertEqual(list(scores), [0, -1, -np.inf, -3])
+        self.assertEqual(len(self.exchange.pending_slots()), 0)
+
+    def test_strategy_picks_best_scored_move(self):
+        # Moving left (or right) merges the two tiles.
+        board = Board().update((0, 0), 2).update((1, 0), 2)
+        move = self._request_with_server(
+            lambda: SharedModelStrategy(self.exchange, 0).get_move(board, 0))
+        self.assertEqual(move, LEFT)
+
+    def test_stop_wakes_server(self):
+        self.exchange.stop()
+        start = time.monotonic()
+        self.assertEqual(
+            len(self.exchange.wait_for_requests(TIMEOUT_SECONDS)), 0)
+        self.assertLess(time.monotonic() - start, TIMEOUT_SECONDS / 2)
+        self.assertTrue(self.exchange.stopped())
+
+    def test_other_process_sees_same_memory(self):
+        process = self.context.Process(
+            target=_write_board, args=(self.exchange,))
+        process.start()
+        process.join()
+        self.assertEqual(self.exchange.boards[1, 2], 17)
+
+
+if __name__ == '__main__':
+    unittest.main()
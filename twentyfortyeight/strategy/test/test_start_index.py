@@ -0,0 +1,57 @@
+import random
+import unittest
+
+import numpy as np
+
+from game.board import Board, exponents_can_move
+from game.game import Game
+from game.rng import CounterRng
+from strategy.basic import RandomStrategy
+from strategy.nn.data import Dataset
+from strategy.nn.start_index import StartingPositionIndex, game_depths
+
+
+class TestStartingPositionIndex(unittest.TestCase):
+    def setUp(self):
+        self.dataset = Dataset()
+        for i in range(5):
+            self.dataset.add_game(RandomStrategy(random.Random(i)), None,
+                                  Game(rnd=CounterRng(2, i)))
+        self.index = StartingPositionIndex(self.dataset)
+
+    def test_game_depths(self):
+        self.assertEqual(list(game_depths([3, 2, 1, 2, 1, 4, 3])),
+                         [0, 1, 2, 0, 1, 0, 1])
+
+    def test_dead_positions_dropped(self):
+        examples = np.concatenate(self.dataset.example_batches())
+        self.assertEqual(self.index.num_positions(),
+                         exponents_can_move(examples).sum())
+        self.assertEqual(sum(count for _, count in self.index.strata()),
+                         self.index.num_positions())
+
+    def test_sampling_respects_weights(self):
+        strata = self.index.strata()
+        top_tile = max(stratum[0] for stratum, _ in strata)
+        self.index.set_weights(lambda stratum: stratum[0] == top_tile)
+        rnd = random.Random(1)
+        for _ in range(20):
+            self.assertEqual(self.index.sample(rnd).max(), top_tile)
+
+    def test_big_tiles_survive_into_starting_game(self):
+        big_board = Board([[1024, 512, 256, 0], [2, 4, 0, 0],
+                           [0, 0, 0, 0], [0, 0, 0, 0]])
+        self.dataset.add_game(RandomStrategy(random.Random(9)), None,
+                              Game(big_board, rnd=CounterRng(2, 9)))
+        index = StartingPositionIndex(self.dataset)
+        index.set_weights(lambda stratum: stratum[0] == 10)  # 1024
+        rnd = random.Random(1)
+        for _ in range(20):
+            game = Game(index.sample_board(rnd), rnd=rnd)
+            self.assertEqual(max(max(column)
+                                 for column in game.board().columns()),
+                             1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
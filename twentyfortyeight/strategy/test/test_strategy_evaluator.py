@@ -0,0 +1,81 @@
+import itertools
+import unittest
+
+from strategy.strategy_evaluator import StrategyEvaluator
+
+
+class _ScriptedEvaluator(StrategyEvaluator):
+    """A StrategyEvaluator whose runs score @p scores in turn (cycling)
+    instead of playing games."""
+
+    def __init__(self, scores):
+        super().__init__(None)
+        self._scores = itertools.cycle(scores)
+        self.runs = 0
+
+    def one_run(self):
+        self.runs += 1
+        return next(self._scores)
+
+
+class TestEvaluateSequential(unittest.TestCase):
+    def test_precision_stop(self):
+        # Scores alternating 90 and 110 have a standard deviation of about
+        # 10, so the half-width falls to 5 at about (1.96 * 10 / 5) ** 2, or
+        # 16 runs; the min_runs floor of 50 is reached first.
+        evaluator = _ScriptedEvaluator([90, 110])
+        result = evaluator.evaluate_sequential(precision=5, batch_size=10,
+                                               min_runs=50)
+        self.assertEqual(result.num_runs, 50)
+        self.assertEqual(evaluator.runs, 50)
+        self.assertAlmostEqual(result.mean, 100)
+        self.assertLessEqual((result.high - result.low) / 2, 5)
+        self.assertEqual(result.verdict, 0)
+
+    def test_precision_needs_more_runs_than_floor(self):
+        evaluator = _ScriptedEvaluator([0, 200])
+        result = evaluator.evaluate_sequential(precision=20, batch_size=10,
+                                               min_runs=10)
+        # The half-width 1.96 * 100 / sqrt(n) is first at most 20 at n = 97,
+        # so the evaluation stops at the end of the tenth batch.
+        self.assertEqual(result.num_runs, 100)
+        self.assertLessEqual((result.high - result.low) / 2, 20)
+
+    def test_worse_than_reference(self):
+        evaluator = _ScriptedEvaluator([90, 110])
+        result = evaluator.evaluate_sequential(reference=200, batch_size=10,
+                                               min_runs=20)
+        self.assertEqual(result.verdict, -1)
+        self.assertEqual(result.num_runs, 20)
+        self.assertLess(result.high, 200)
+
+    def test_better_than_reference(self):
+        evaluator = _ScriptedEvaluator([90, 110])
+        result = evaluator.evaluate_sequential(reference=50, batch_size=10,
+                                               min_runs=20)
+        self.assertEqual(result.verdict, 1)
+        self.assertGreater(result.low, 50)
+
+    def test_min_runs_floor(self):
+        # The interval excludes the reference after the first batch, but no
+        # verdict is given before min_runs runs.
+        evaluator = _ScriptedEvaluator([90, 110])
+        result = evaluator.evaluate_sequential(reference=200, batch_size=5,
+                                               min_runs=30)
+        self.assertEqual(result.num_runs, 30)
+        self.assertEqual(result.verdict, -1)
+
+    def test_max_runs_cap(self):
+        # A reference equal to the mean is never settled.
+        evaluator = _ScriptedEvaluator([90, 110])
+        result = evaluator.evaluate_sequential(reference=100, batch_size=7,
+                                               min_runs=10, max_runs=40)
+        self.assertEqual(result.num_runs, 40)
+        self.assertEqual(evaluator.runs, 40)
+        self.assertEqual(result.verdict, 0)
+        self.assertLess(result.low, 100)
+        self.assertGreater(result.high, 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+from strategy.nn.sweep import RESULT_COLUMNS, SweepRunner, halving_schedule
+
+# A trial's validation loss is its base loss over the epochs trained.
+BASE_LOSSES = [4., 1., 3., 2.]
+
+
+class _FakePool(object):
+    """Answers trial tasks with scripted losses instead of training, in the
+    reverse of the order they were given, recording the tasks."""
+
+    def __init__(self):
+        self.tasks = []
+        self._epochs = {}
+
+    def imap_unordered(self, function, tasks):
+        tasks = list(tasks)
+        self.tasks.append(tasks)
+        results = []
+        for trial, hparams, epochs, checkpoint in reversed(tasks):
+            self._epochs[trial] = self._epochs.get(trial, 0) + epochs
+            loss = BASE_LOSSES[trial] / self._epochs[trial]
+            results.append((trial, loss, loss / 2, 1.))
+        return iter(results)
+
+
+class TestSweep(unittest.TestCase):
+    def test_halving_schedule(self):
+        self.assertEqual(halving_schedule(9, 1, 27, 3),
+                         [(9, 1), (3, 3), (1, 9)])
+        self.assertEqual(halving_schedule(27, 1, 9, 3),
+                         [(27, 1), (9, 3), (3, 9)])
+        self.assertEqual(halving_schedule(4, 2, 100, 3),
+                         [(4, 2), (1, 6)])
+        self.assertEqual(halving_schedule(1, 5, 3, 2), [(1, 3)])
+
+    def test_stale_trial_models_removed(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            runner = SweepRunner([{}], work_dir,
+                                 os.path.join(work_dir, "results.tsv"),
+                                 verbose=False)
+            with open(runner.checkpoint(0), "w") as f:
+                f.write("model from an earlier sweep")
+            runner = SweepRunner([{}], work_dir,
+                                 os.path.join(work_dir, "results.tsv"),
+                                 verbose=False)
+            self.assertFalse(os.path.exists(runner.checkpoint(0)))
+
+    def test_run_keeps_best_trials(self):
+        trials = [{"conv_channels": channels, "dense_sizes": [channels, 2],
+                   "tile_embedding": None} for channels in range(4)]
+        pool = _FakePool()
+        with tempfile.TemporaryDirectory() as work_dir:
+            results_filename = os.path.join(work_dir, "results.tsv")
+            runner = SweepRunner(trials, work_dir, results_filename,
+                                 verbose=False)
+            # Rounds of 4 trials to 1 epoch, 2 to 2 and 1 to 4.
+            ranked = runner.run(pool, 1, 4, 2)
+            with open(results_filename) as f:
+                rows = [line.rstrip("\n").split("\t") for line in f]
+        self.assertEqual(ranked, [(0.25, 1)])
+        self.assertEqual([[(trial, epochs) for trial, _, epochs, _ in tasks]
+                          for tasks in pool.tasks],
+                         [[(0, 1), (1, 1), (2, 1), (3, 1)],
+                          [(1, 1), (3, 1)],
+                          [(1, 2)]])
+        self.assertEqual(tuple(rows[0]), RESULT_COLUMNS)
+        # Rows are written in the order the pool finished the trials.
+        self.assertEqual([(row[0], row[1], row[5]) for row in rows[1:]],
+                         [("0", "3", "1"), ("0", "2", "1"), ("0", "1", "1"),
+                          ("0", "0", "1"), ("1", "3", "2"), ("1", "1", "2"),
+                          ("2", "1", "4")])
+        self.assertEqual(rows[1], ["0", "3", "3", "3,2", "None", "1", "2.0",
+                                   "1.0", "1.0"])
+        self.assertEqual(rows[-1], ["2", "1", "1", "1,2", "None", "4",
+                                    "0.25", "0.125", "1.0"])
+
+
+if __name__ == '__main__':
+    unittest.main()
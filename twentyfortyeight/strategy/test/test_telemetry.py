@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+
+from strategy.telemetry import (JsonLinesReporter, PrometheusExporter,
+                                Telemetry, merge_snapshots, summarize)
+
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.first, self.second = Telemetry(), Telemetry()
+        for i in range(100):
+            self.first.record_move(0.001, illegal=(i % 4 == 0))
+        self.second.record_move(1.)
+        self.first.record_game(1000)
+        self.second.record_game(3000)
+        self.second.record_examples(50)
+
+    def test_merge_and_summarize(self):
+        metrics = summarize(merge_snapshots([self.first.snapshot(),
+                                             self.second.snapshot()]))
+        self.assertEqual(metrics["games"], 2)
+        self.assertEqual(metrics["moves"], 101)
+        self.assertEqual(metrics["examples"], 50)
+        self.assertAlmostEqual(metrics["illegal_move_fraction"], 25 / 101)
+        self.assertEqual(metrics["score_mean"], 2000)
+        self.assertEqual(metrics["score_histogram"], {1024: 1, 4096: 1})
+        # Latencies are reported to within a quarter octave.
+        self.assertGreaterEqual(metrics["latency_p50_seconds"], 0.001)
+        self.assertLess(metrics["latency_p50_seconds"], 0.0012)
+        self.assertGreaterEqual(metrics["latency_p99_seconds"], 0.001)
+        self.assertLess(metrics["latency_p99_seconds"], 0.0012)
+        self.assertGreater(metrics["rss_bytes"], 0)
+
+    def test_json_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "telemetry.jsonl")
+            reporter = JsonLinesReporter(self.first, filename, period=3600)
+            reporter.stop()
+            with open(filename) as f:
+                self.assertEqual(json.loads(f.readline())["moves"], 100)
+
+    def test_prometheus(self):
+        exporter = PrometheusExporter(self.first, 0)
+        port = exporter._server.server_address[1]
+        try:
+            with urllib.request.urlopen(
+                    "http://localhost:%d/metrics" % port) as response:
+                text = response.read().decode()
+        finally:
+            exporter.stop()
+        self.assertIn("twentyfortyeight_moves 100\n", text)
+        self.assertIn('twentyfortyeight_score_bucket{below="1024"} 1\n', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+from strategy.eval_cache import EvaluationCache, strategy_key
+from strategy.tournament import TournamentResult, run_tournament
+
+SEEDS = range(4)
+
+
+class TestTournamentResult(unittest.TestCase):
+    def setUp(self):
+        self.result = TournamentResult(
+            ["a", "b"],
+            [(1, {"a": (100, 8, 50), "b": (300, 32, 120)}),
+             (2, {"a": (200, 16, 90), "b": (250, 16, 100)})])
+
+    def test_per_seed(self):
+        self.assertEqual([seed for seed, _ in self.result.per_seed()],
+                         [1, 2])
+        self.assertEqual(self.result.per_seed()[1][1]["b"], (250, 16, 100))
+
+    def test_paired_difference(self):
+        diff = self.result.paired_difference("b", "a")
+        self.assertEqual(diff.count(), 2)
+        self.assertAlmostEqual(diff.mean(), 125.)
+        self.assertAlmostEqual(diff.variance(), 2 * 75. ** 2)
+
+    def test_ranking(self):
+        self.assertEqual(self.result.ranking(), ["b", "a"])
+
+
+class TestRunTournament(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_deterministic_strategy_has_zero_paired_difference(self):
+        # The same deterministic strategy, played in different numbers of
+        # worker processes, must see the same tiles and so score the same
+        # on every seed.
+        first = run_tournament(["greedy", "random"], SEEDS, processes=1)
+        second = run_tournament(["greedy"], SEEDS, processes=2)
+        self.assertEqual([seed for seed, _ in first.per_seed()], list(SEEDS))
+        both = TournamentResult(
+            ["first", "second"],
+            [(seed, {"first": a["greedy"], "second": b["greedy"]})
+             for (seed, a), (_, b) in zip(first.per_seed(),
+                                          second.per_seed())])
+        diff = both.paired_difference("first", "second")
+        self.assertEqual(diff.count(), len(SEEDS))
+        self.assertEqual(diff.mean(), 0)
+        self.assertEqual(diff.variance(), 0)
+        self.assertEqual(first.ranking(), ["greedy", "random"])
+
+    def test_cached_seeds_are_not_replayed(self):
+        cache = EvaluationCache(self.filename)
+        # No real game on these seeds ends with these outcomes, so they
+        # can only come back from the cache.
+        sentinels = {0: (1, 2, 3), 1: (4, 8, 5)}
+        cache.store(strategy_key("greedy"), sentinels)
+        result = run_tournament(["greedy"], SEEDS, processes=1, cache=cache)
+        outcomes = dict((seed, outcome["greedy"])
+                        for seed, outcome in result.per_seed())
+        self.assertEqual(outcomes[0], sentinels[0])
+        self.assertEqual(outcomes[1], sentinels[1])
+        self.assertEqual(cache.lookup(strategy_key("greedy"), SEEDS),
+                         outcomes)
+        again = run_tournament(["greedy"], SEEDS, processes=1, cache=cache)
+        self.assertEqual(again.per_seed(), result.per_seed())
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+"""A tournament runner that plays several strategies against the same
+sequences of random tiles ("common random numbers"), so that differences
+between strategies are not buried in the noise of differing tile draws.
+
+Each seed determines the tile stream of one game, and every strategy plays
+one game on every seed.  Score differences are then reported per seed,
+which cancels most of the luck of the draw out of the comparison."""
+
+import argparse
+import itertools
+import multiprocessing
+import sys
+
+from game.game import Game
+from game.rng import CounterRng
+from strategy.eval_cache import EvaluationCache, strategy_key
+from strategy.factory import make_strategy
+from strategy.score_stats import GameStats, RunningStats
+from strategy.strategy_evaluator import play_game
+
+
+# Strategies for the current worker process, by name; see _init_worker.
+_worker_strategies = {}
+
+
+def _init_worker(strategy_names):
+    """Build each strategy once per worker process rather than once per
+    game, as learned strategies are expensive to load."""
+    for name in strategy_names:
+        _worker_strategies[name] = make_strategy(name)
+
+
+def _play_seed(task):
+    """@return (seed, {name: (score, max_tile, num_moves)}) from playing
+    the worker strategy of each of the names on the tile stream for the
+    seed, where @p task is (seed, names)."""
+    seed, names = task
+    return seed, {name: play_game(_worker_strategies[name],
+                                  Game(rnd=CounterRng(seed)))
+                  for name in names}
+
+
+class TournamentResult(object):
+    """The per-seed outcomes of a tournament, with paired summaries."""
+
+    def __init__(self, strategy_names, per_seed):
+        """@p per_seed is a list of (seed, {name: (score, max_tile,
+        num_moves)}) in seed order."""
+        self._names = list(strategy_names)
+        self._per_seed = per_seed
+
+    def per_seed(self):
+        return self._per_seed
+
+    def score_stats(self, name):
+        stats = RunningStats()
+        for _, outcomes in self._per_seed:
+            stats.add(outcomes[name][0])
+        return stats
+
+    def game_stats(self, name):
+        stats = GameStats()
+        for _, outcomes in self._per_seed:
+            stats.add(*outcomes[name])
+        return stats
+
+    def paired_difference(self, name_a, name_b):
+        """@return RunningStats of the per-seed score of @p name_a minus
+        that of @p name_b."""
+        stats = RunningStats()
+        for _, outcomes in self._per_seed:
+            stats.add(outcomes[name_a][0] - outcomes[name_b][0])
+        return stats
+
+    def ranking(self):
+        """@return the strategy names, best mean score first."""
+        return sorted(self._names,
+                      key=lambda name: -self.score_stats(name).mean())
+
+    def print_report(self, show_seeds=False):
+        if show_seeds:
+            print("seed\t" + "\t".join(self._names))
+            for seed, outcomes in self._per_seed:
+                print("%d\t" % seed +
+                      "\t".join("%d" % outcomes[name][0]
+                                for name in self._names))
+        print("Ranking after %d seeds:" % len(self._per_seed))
+        for rank, name in enumerate(self.ranking()):
+            stats = self.game_stats(name)
+            print("  %d. %s: mean %f (stderr %f), p50 %.0f, p99 %.0f, "
+                  "2048 rate %.2f%%" %
+                  (rank + 1, name, stats.scores().mean(),
+                   stats.scores().stderr(), stats.score_quantile(0.5),
+                   stats.score_quantile(0.99), 100 * stats.tile_rate(2048)))
+        print("Paired differences:")
+        for name_a, name_b in itertools.combinations(self.ranking(), 2):
+            diff = self.paired_difference(name_a, name_b)
+            low, high = diff.confidence_interval()
+            print("  %s - %s: mean %f, variance %f, 95%% CI %f to %f" %
+                  (name_a, name_b, diff.mean(), diff.variance(), low, high))
+
+
+def run_tournament(strategy_names, seeds, processes=None, cache=None):
+    """Play every strategy in @p strategy_names on every seed in @p seeds,
+    spread across @p processes worker processes (default: one per CPU).
+    If an EvaluationCache @p cache is given, only the games it does not
+    hold are played, and their outcomes are added to it.
+
+    @return a TournamentResult."""
+    seeds = list(seeds)
+    per_seed = {seed: {} for seed in seeds}
+    keys = {}
+    if cache is not None:
+        for name in strategy_names:
+            keys[name] = strategy_key(name)
+            for seed, outcome in cache.lookup(keys[name], seeds).items():
+                per_seed[seed][name] = outcome
+    tasks = [(seed, [name for name in strategy_names
+                     if name not in per_seed[seed]])
+             for seed in seeds]
+    tasks = [task for task in tasks if task[1]]
+    if tasks:
+        names_to_play = sorted(set(name for _, names in tasks
+                                   for name in names))
+        with multiprocessing.Pool(processes, initializer=_init_worker,
+                                  initargs=(names_to_play,)) as pool:
+            for seed, outcomes in pool.imap(_play_seed, tasks):
+                per_seed[seed].update(outcomes)
+                if cache is not None:
+                    for name, outcome in outcomes.items():
+                        cache.put(keys[name], seed, outcome)
+    return TournamentResult(strategy_names,
+                            [(seed, per_seed[seed]) for seed in seeds])
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--strategies', metavar='FILE_OR_NAME', type=str,
+                        nargs='+', default=["random", "spinny"],
+                        help="names of strategies or filenames of models")
+    parser.add_argument('--number_of_games', type=int, default=100,
+                        help="number of seeds on which to play each strategy")
+    parser.add_argument('--first_seed', type=int, default=0,
+                        help="seeds run from this value upward")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="number of worker processes (default: per CPU)")
+    parser.add_argument('--show_seeds', action="store_true",
+                        help="print the score of every strategy on every seed")
+    parser.add_argument('--cache', metavar='FILENAME', type=str,
+                        help=("sqlite file of cached game outcomes to reuse "
+                              "and extend (created if it does not exist)"))
+    args = parser.parse_args(argv[1:])
+
+    seeds = range(args.first_seed, args.first_seed + args.number_of_games)
+    cache = EvaluationCache(args.cache) if args.cache else None
+    result = run_tournament(args.strategies, seeds, args.processes, cache)
+    if cache is not None:
+        cache.close()
+    result.print_report(show_seeds=args.show_seeds)
+
+
+if __name__ == '__main__':
+    main(sys.argv)